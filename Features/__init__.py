@@ -1,3 +1 @@
-# from .whiteboard.whiteboard import Whiteboard
-from .whiteboard.whiteboard import Whiteboard
-from .brain_storm.textCanvas import TextCanvas
\ No newline at end of file
+# Pages are imported on first use, see UI/scenes.py
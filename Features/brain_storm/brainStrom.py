@@ -4,7 +4,7 @@ from PySide6.QtWidgets import (
 )
 
 from Features.brain_storm.textCanvas import TextCanvas
-from Utils.load_stylesheet import load_stylesheet
+from Utils.load_stylesheet import apply_stylesheet
 from Utils.idea_generator import generate_game_parts
 
 
@@ -15,7 +15,7 @@ class BrainStorm(QWidget):
         layout.setContentsMargins(5, 5, 5, 5)
         layout.setSpacing(5)
         
-        self.setStyleSheet(load_stylesheet("UI/stylesheet/navbar.qss"))
+        apply_stylesheet(self, "UI/stylesheet/navbar.qss")
 
         # --- Header bar with idea + regenerate button ---
         header = QHBoxLayout()
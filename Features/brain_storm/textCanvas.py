@@ -2,7 +2,7 @@ from PySide6.QtWidgets import QWidget, QTextEdit
 from PySide6.QtCore import Qt, QPoint
 from PySide6.QtGui import QMouseEvent
 
-from Utils.load_stylesheet import load_stylesheet
+from Utils.load_stylesheet import apply_stylesheet
 
 
 class DraggableTextEdit(QTextEdit):
@@ -57,7 +57,8 @@ class TextCanvas(QWidget):
 	def __init__(self, parent=None):
 		super().__init__(parent)
 		self.setAttribute(Qt.WA_StyledBackground, True)
-		self.setStyleSheet("background-color: #18181C;")
+		# One sheet for the canvas and every text box on it
+		apply_stylesheet(self, "UI/stylesheet/textCanvas.qss")
 		self.text_boxes = []
 
 	def mousePressEvent(self, event: QMouseEvent):
@@ -77,7 +78,6 @@ class TextCanvas(QWidget):
 		text_edit.setPlaceholderText("Type here...")
 		text_edit.move(pos)
 		text_edit.resize(250, 40)
-		text_edit.setStyleSheet(load_stylesheet("UI/stylesheet/textField.qss"))
 		text_edit.show()
 		text_edit.setFocus()
 		self.text_boxes.append(text_edit)
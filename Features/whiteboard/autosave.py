@@ -0,0 +1,168 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PySide6.QtCore import QTimer
+
+from .board_file import BoardFormatError, BoardWriter
+
+AUTOSAVE_FILE = Path.home() / ".xpoflow" / "whiteboard.xpf"
+IDLE_MS = 1500  # save once drawing pauses this long
+MAX_DELAY_S = 20.0  # and at least this often while it does not
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="board-autosave")
+
+
+def _rewrite(path, strokes, view, layers, tool_ids, picture_ids):
+	tmp = path.with_suffix(".tmp")
+	with open(tmp, "wb") as f:
+		w = BoardWriter(f, tool_ids, picture_ids)
+		w.header()
+		w.view(*view)
+		w.layers(*layers)
+		w.strokes(strokes)
+		f.flush()
+		os.fsync(f.fileno())
+	os.replace(tmp, path)
+
+
+def _append(path, strokes, dropped, view, layers, tool_ids, picture_ids):
+	with open(path, "ab") as f:
+		w = BoardWriter(f, tool_ids, picture_ids)
+		if layers is not None:
+			w.layers(*layers)
+		w.strokes(strokes)
+		w.drop(dropped)
+		w.view(*view)
+		f.flush()
+		os.fsync(f.fileno())
+
+
+class AutosaveMixin:
+	"""Keeps a copy of the board in AUTOSAVE_FILE without stalling input.
+
+	Changes to the stroke log are collected as they happen. Saving hands the
+	new strokes and the numbers of the removed ones to a writer thread,
+	which appends them to the file, so the GUI thread only does work in
+	proportion to what changed. Strokes are never modified once committed,
+	so sharing them with the writer needs no copy. The file is rewritten
+	from scratch (to a temporary name, then renamed over it) only when an
+	undo puts a stroke back between older ones or when most of it is dead.
+	Each board saves to its own ``autosave_path``, AUTOSAVE_FILE unless
+	Whiteboard is given another; None turns autosave off.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self.autosave_path = AUTOSAVE_FILE
+		self._autosave_timer = None
+		self._autosave_job = None
+		self._autosave_tools = {}  # writer thread only
+		self._autosave_pictures = {}  # likewise
+		self._autosave_rebase()
+
+	def _autosave_rebase(self):
+		self._saved = None  # seq -> stroke number in the file, None before the first save
+		self._saved_top = -1
+		self._saved_dead = 0
+		self._unsaved = {}  # seq -> Stroke
+		self._unsaved_drops = []
+		self._dirty_since = None
+		self.layers_dirty = False
+
+	def _log_strokes(self, removed, added):
+		if self.loading or self.autosave_path is None:
+			return
+		for stroke in removed:
+			if self._unsaved.pop(stroke.seq, None) is None:
+				self._unsaved_drops.append(stroke.seq)
+		for stroke in added:
+			self._unsaved[stroke.seq] = stroke
+		self.schedule_autosave()
+
+	def schedule_autosave(self):
+		if self.autosave_path is None:
+			return
+		if self._autosave_timer is None:
+			self._autosave_timer = QTimer(self)
+			self._autosave_timer.setSingleShot(True)
+			self._autosave_timer.timeout.connect(self.autosave)
+		now = time.monotonic()
+		if self._dirty_since is None:
+			self._dirty_since = now
+		if now - self._dirty_since > MAX_DELAY_S:
+			self.autosave()
+		else:
+			self._autosave_timer.start(IDLE_MS)
+
+	def autosave(self):
+		job = self._autosave_job
+		if self.loading or (job is not None and not job.done()):
+			# One write in flight at a time; try again shortly
+			self._autosave_timer.start(IDLE_MS)
+			return
+		if job is not None and job.exception() is not None:
+			self._saved = None  # the file may end in a partial write
+		self._autosave_job = None
+
+		full = (
+			self._saved is None
+			or any(seq < self._saved_top for seq in self._unsaved)
+			or 2 * (self._saved_dead + len(self._unsaved_drops)) > len(self._saved) + 64
+		)
+		if not full and not self._unsaved and not self._unsaved_drops and not self.layers_dirty:
+			self._dirty_since = None
+			return
+		view = (self.zoom, self.pan.x(), self.pan.y())
+		layers = (self.layers.structure(), self.layers.active.id)
+		try:
+			self.autosave_path.parent.mkdir(parents=True, exist_ok=True)
+		except OSError:
+			return  # best-effort; the changes stay queued for the next try
+
+		if full:
+			strokes = list(self.strokes)
+			self._autosave_tools = {}
+			self._autosave_pictures = {}
+			self._saved = {s.seq: i for i, s in enumerate(strokes)}
+			self._saved_dead = 0
+			self._autosave_job = _writer.submit(
+				_rewrite, self.autosave_path, strokes, view, layers,
+				self._autosave_tools, self._autosave_pictures,
+			)
+		else:
+			added = sorted(self._unsaved.values(), key=lambda s: s.seq)
+			dropped = [self._saved.pop(seq) for seq in self._unsaved_drops]
+			base = len(self._saved) + self._saved_dead + len(dropped)
+			for i, stroke in enumerate(added):
+				self._saved[stroke.seq] = base + i
+			self._saved_dead += len(dropped)
+			self._autosave_job = _writer.submit(
+				_append, self.autosave_path, added, dropped, view,
+				layers if self.layers_dirty else None, self._autosave_tools, self._autosave_pictures,
+			)
+		if self.strokes:
+			self._saved_top = self.strokes[-1].seq
+		self._unsaved = {}
+		self._unsaved_drops = []
+		self._dirty_since = None
+		self.layers_dirty = False
+
+	def flush_autosave(self):
+		"""Write anything unsaved and wait for it to reach the disk."""
+		self._finish_load()
+		if self._autosave_job is not None:
+			self._autosave_job.exception()
+		if self._dirty_since is not None:
+			self.autosave()
+			if self._autosave_job is not None:
+				self._autosave_job.exception()
+
+	def restore_autosave(self):
+		if self.autosave_path is None or not self.autosave_path.exists():
+			return
+		try:
+			self.load_board(self.autosave_path, remember=False)
+		except (OSError, BoardFormatError):
+			pass  # best-effort, like the save itself
@@ -0,0 +1,382 @@
+"""XpoFlow board files (``.xpf``).
+
+A file is an 8 byte header followed by chunks, each a 4 byte tag, a u32
+payload length and the payload::
+
+	b"XPFB" u16 version u16 flags
+	VIEW  f32 zoom, i32 pan x, i32 pan y
+	LAYR  layers from bottom to top and the active one (see encode_layers)
+	TOOL  tool names referenced by index from STRK
+	STRK  a batch of strokes (see encode_strokes)
+	IMAG  u32 id, encoded bytes of a picture used by image strokes
+	TILE  i32 tx, i32 ty, u16 layer, PNG bytes of one raster tile (optional cache)
+	DROP  varint numbers of earlier strokes that are no longer on the board
+	END
+
+Stroke points are quantized to 1/16 px and stored as zigzag varint deltas,
+so a typical sample costs two or three bytes. Readers skip unknown tags,
+and chunk headers can be walked over a memory map without decoding any
+payload, which is what lets a board show its first viewport before the
+rest of it has been read.
+
+Version 1 files predate layers: they have no LAYR chunk, no layer ids in
+STRK and TILE, and everything in them is on layer 0.
+
+Strokes are numbered in the order they appear across all STRK chunks.
+Chunks may be appended after the fact: a later VIEW or TOOL replaces an
+earlier one (tool tables only ever grow), DROP removes strokes by number,
+and a chunk cut short at the end of the file is ignored, so an
+interrupted append never spoils what came before it.
+
+Image strokes have no colour; theirs holds the id of the IMAG chunk with
+their picture, which is written before the first STRK that uses it.
+"""
+import mmap
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice
+from PySide6.QtGui import QImage
+
+MAGIC = b"XPFB"
+VERSION = 2
+QUANT = 16.0  # point precision is 1 / QUANT px
+STROKES_PER_CHUNK = 512
+
+_HEADER = struct.Struct("<4sHH")
+_CHUNK = struct.Struct("<4sI")
+_VIEW = struct.Struct("<fii")
+_TILE = struct.Struct("<iiH")
+_TILE_V1 = struct.Struct("<ii")
+_LAYER = struct.Struct("<HBfB")  # id, visible, opacity, name length
+_STRK = struct.Struct("<III")  # stroke count, count-stream bytes, point-stream bytes
+_IMAG = struct.Struct("<I")
+
+_decoder = ThreadPoolExecutor(max_workers=2, thread_name_prefix="board-decode")
+
+
+class BoardFormatError(ValueError):
+	pass
+
+
+def encode_varints(values):
+	"""LEB128-encode non-negative integers, vectorized over a NumPy array."""
+	v = np.asarray(values, dtype=np.uint64)
+	if not len(v):
+		return b""
+	nbytes = np.ones(len(v), dtype=np.int64)
+	for k in range(1, 10):
+		nbytes += v >= (np.uint64(1) << np.uint64(7 * k))
+	starts = np.concatenate(([0], np.cumsum(nbytes)[:-1]))
+	out = np.empty(int(nbytes.sum()), dtype=np.uint8)
+	for k in range(int(nbytes.max())):
+		sel = nbytes > k
+		byte = (v[sel] >> np.uint64(7 * k)) & np.uint64(0x7F)
+		more = (nbytes[sel] > k + 1).astype(np.uint64) << np.uint64(7)
+		out[starts[sel] + k] = (byte | more).astype(np.uint8)
+	return out.tobytes()
+
+
+def decode_varints(buf):
+	"""Inverse of encode_varints; ``buf`` is any bytes-like object."""
+	b = np.frombuffer(buf, dtype=np.uint8)
+	if not len(b):
+		return np.zeros(0, dtype=np.uint64)
+	last = (b & 0x80) == 0
+	group = np.concatenate(([0], np.cumsum(last)[:-1]))
+	starts = np.flatnonzero(np.concatenate(([True], last[:-1])))
+	shift = (np.arange(len(b)) - starts[group]).astype(np.uint64) * np.uint64(7)
+	parts = (b & 0x7F).astype(np.uint64) << shift
+	return np.bitwise_or.reduceat(parts, starts)
+
+
+def _zigzag(d):
+	return ((d << 1) ^ (d >> 63)).astype(np.uint64)
+
+
+def _unzigzag(z):
+	z = z.astype(np.int64)
+	return (z >> 1) ^ -(z & 1)
+
+
+def encode_strokes(strokes, tool_ids, picture_ids=None):
+	counts = np.array([len(s) for s in strokes], dtype=np.uint64)
+	tools = np.array([tool_ids[s.tool] for s in strokes], dtype=np.uint8)
+	colors = np.array([
+		picture_ids[s.picture] if s.tool == "image" else s.color for s in strokes
+	], dtype=np.uint32)
+	widths = np.array([s.width for s in strokes], dtype=np.float32)
+	layers = np.array([s.layer for s in strokes], dtype=np.uint16)
+	pts = np.concatenate([np.frombuffer(s.points, dtype=np.float32) for s in strokes])
+	q = np.rint(pts.reshape(-1, 2).astype(np.float64) * QUANT).astype(np.int64)
+	deltas = np.diff(q, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+	count_stream = encode_varints(counts)
+	point_stream = encode_varints(_zigzag(deltas))
+	return b"".join((
+		_STRK.pack(len(strokes), len(count_stream), len(point_stream)),
+		tools.tobytes(), colors.tobytes(), widths.tobytes(), layers.tobytes(),
+		count_stream, point_stream,
+	))
+
+
+def decode_strokes(buf, tool_names, base=0, dropped=(), version=VERSION):
+	"""Decode one STRK payload into ``(tool, color, width, points, layer)`` tuples.
+
+	``base`` is the number of the chunk's first stroke; strokes whose number
+	is in ``dropped`` are left out.
+	"""
+	from array import array
+
+	n, count_len, point_len = _STRK.unpack_from(buf, 0)
+	pos = _STRK.size
+	tools = np.frombuffer(buf, dtype=np.uint8, count=n, offset=pos)
+	pos += n
+	colors = np.frombuffer(buf, dtype=np.uint32, count=n, offset=pos)
+	pos += 4 * n
+	widths = np.frombuffer(buf, dtype=np.float32, count=n, offset=pos)
+	pos += 4 * n
+	if version >= 2:
+		layers = np.frombuffer(buf, dtype=np.uint16, count=n, offset=pos)
+		pos += 2 * n
+	else:
+		layers = np.zeros(n, dtype=np.uint16)
+	counts = decode_varints(buf[pos:pos + count_len]).astype(np.int64)
+	pos += count_len
+	deltas = _unzigzag(decode_varints(buf[pos:pos + point_len]))
+	pts = (np.cumsum(deltas.reshape(-1, 2), axis=0) / QUANT).astype(np.float32)
+
+	out = []
+	ends = np.cumsum(counts)
+	for i in range(n):
+		if base + i in dropped:
+			continue
+		points = array("f")
+		points.frombytes(pts[ends[i] - counts[i]:ends[i]].tobytes())
+		out.append((tool_names[tools[i]], int(colors[i]), float(widths[i]), points, int(layers[i])))
+	return out
+
+
+def encode_layers(layers, active):
+	"""``layers`` is ``[(id, name, visible, opacity)]`` from bottom to top."""
+	out = [struct.pack("<HH", active, len(layers))]
+	for id, name, visible, opacity in layers:
+		raw = name.encode()[:255]
+		out.append(_LAYER.pack(id, visible, opacity, len(raw)) + raw)
+	return b"".join(out)
+
+
+def decode_layers(buf):
+	buf = bytes(buf)
+	active, n = struct.unpack_from("<HH", buf, 0)
+	pos = 4
+	layers = []
+	for _ in range(n):
+		id, visible, opacity, length = _LAYER.unpack_from(buf, pos)
+		pos += _LAYER.size
+		layers.append((id, buf[pos:pos + length].decode(errors="replace"), bool(visible), opacity))
+		pos += length
+	return layers, active
+
+
+def encode_png(img):
+	data = QByteArray()
+	buf = QBuffer(data)
+	buf.open(QIODevice.WriteOnly)
+	img.save(buf, "PNG")
+	buf.close()
+	return data.data()
+
+
+def decode_png(buf):
+	img = QImage.fromData(bytes(buf), "PNG")
+	if img.isNull():
+		raise BoardFormatError("damaged tile image")
+	return img.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+
+
+class BoardWriter:
+	"""Writes board chunks to the binary file object ``f``.
+
+	``tool_ids`` carries the tool table over when appending to a file that
+	already has one; tools seen for the first time extend it.
+	``picture_ids`` does the same for the pictures already written.
+	"""
+
+	def __init__(self, f, tool_ids=None, picture_ids=None):
+		self.f = f
+		self.tool_ids = tool_ids if tool_ids is not None else {}
+		self.picture_ids = picture_ids if picture_ids is not None else {}
+
+	def chunk(self, tag, payload):
+		self.f.write(_CHUNK.pack(tag, len(payload)))
+		self.f.write(payload)
+
+	def header(self, flags=0):
+		self.f.write(_HEADER.pack(MAGIC, VERSION, flags))
+
+	def view(self, zoom, pan_x, pan_y):
+		self.chunk(b"VIEW", _VIEW.pack(zoom, pan_x, pan_y))
+
+	def layers(self, layers, active):
+		self.chunk(b"LAYR", encode_layers(layers, active))
+
+	def strokes(self, strokes):
+		new = sorted({s.tool for s in strokes} - self.tool_ids.keys())
+		if new:
+			for name in new:
+				self.tool_ids[name] = len(self.tool_ids)
+			names = sorted(self.tool_ids, key=self.tool_ids.get)
+			self.chunk(b"TOOL", encode_varints([len(names)]) + b"".join(
+				bytes([len(n.encode())]) + n.encode() for n in names
+			))
+		for s in strokes:
+			if s.tool == "image" and s.picture not in self.picture_ids:
+				id = self.picture_ids[s.picture] = len(self.picture_ids)
+				self.chunk(b"IMAG", _IMAG.pack(id) + s.picture.data)
+		for i in range(0, len(strokes), STROKES_PER_CHUNK):
+			self.chunk(b"STRK", encode_strokes(
+				strokes[i:i + STROKES_PER_CHUNK], self.tool_ids, self.picture_ids
+			))
+
+	def tiles(self, tiles):
+		for (layer, (tx, ty)), img in tiles.items():
+			self.chunk(b"TILE", _TILE.pack(tx, ty, layer) + encode_png(img))
+
+	def drop(self, numbers):
+		if numbers:
+			self.chunk(b"DROP", encode_varints(sorted(numbers)))
+
+	def end(self):
+		self.chunk(b"END ", b"")
+
+
+def write_board(f, strokes, tiles=None, view=(1.0, 0, 0), layers=None, active=0):
+	"""Write a whole board to the binary file object ``f``.
+
+	``tiles`` maps (layer id, (tx, ty)) to QImage and is stored as the
+	optional PNG tile cache; pass None to store strokes only. ``layers`` is
+	as for encode_layers and defaults to a single layer 0.
+	"""
+	w = BoardWriter(f)
+	w.header(1 if tiles else 0)
+	w.view(*view)
+	w.layers(layers or [(0, "Layer 1", True, 1.0)], active)
+	w.strokes(strokes)
+	w.tiles(tiles or {})
+	w.end()
+
+
+class BoardReader:
+	"""Memory-mapped view of a board file.
+
+	Opening only walks the chunk headers. Payloads are sliced straight out
+	of the map and decoded on demand, either here or on the decode pool.
+	"""
+
+	def __init__(self, path):
+		with open(path, "rb") as f:
+			if not os.fstat(f.fileno()).st_size:
+				raise BoardFormatError("file is empty")
+			self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		self.version = VERSION
+		self.view = None
+		self.layers = None  # [(id, name, visible, opacity)], None before version 2
+		self.active_layer = 0
+		self.tool_names = []
+		self.stroke_chunks = []  # (number of the first stroke, payload)
+		self.stroke_count = 0
+		self.dropped = set()
+		self.tile_chunks = {}  # (layer id, (tx, ty)) -> memoryview of PNG bytes
+		self.picture_chunks = {}  # id -> memoryview of encoded image bytes
+		self._scan()
+
+	def _scan(self):
+		data = memoryview(self.map)
+		if len(data) < _HEADER.size:
+			raise BoardFormatError("file too short")
+		magic, version, _flags = _HEADER.unpack_from(data, 0)
+		if magic != MAGIC or version > VERSION:
+			raise BoardFormatError("not an XpoFlow board")
+		self.version = version
+		pos = _HEADER.size
+		while pos + _CHUNK.size <= len(data):
+			tag, length = _CHUNK.unpack_from(data, pos)
+			pos += _CHUNK.size
+			if pos + length > len(data):
+				break  # torn append
+			payload = data[pos:pos + length]
+			pos += length
+			if tag == b"END ":
+				break
+			try:
+				if tag == b"VIEW":
+					self.view = _VIEW.unpack_from(payload, 0)
+				elif tag == b"LAYR":
+					self.layers, self.active_layer = decode_layers(payload)
+				elif tag == b"TOOL":
+					self.tool_names = _decode_names(payload)
+				elif tag == b"STRK":
+					self.stroke_chunks.append((self.stroke_count, payload))
+					self.stroke_count += _STRK.unpack_from(payload, 0)[0]
+				elif tag == b"IMAG":
+					self.picture_chunks[_IMAG.unpack_from(payload, 0)[0]] = payload[_IMAG.size:]
+				elif tag == b"DROP":
+					self.dropped.update(decode_varints(payload).tolist())
+				elif tag == b"TILE" and version >= 2:
+					tx, ty, layer = _TILE.unpack_from(payload, 0)
+					self.tile_chunks[(layer, (tx, ty))] = payload[_TILE.size:]
+				elif tag == b"TILE":
+					self.tile_chunks[(0, _TILE_V1.unpack_from(payload, 0))] = payload[_TILE_V1.size:]
+			except (struct.error, ValueError, IndexError) as e:
+				raise BoardFormatError(f"damaged {tag.decode(errors='replace').strip()} chunk") from e
+
+	def tile(self, key):
+		return decode_png(self.tile_chunks[key])
+
+	def submit_tiles(self, keys):
+		return [(key, _decoder.submit(decode_png, self.tile_chunks[key])) for key in keys]
+
+	def submit_strokes(self):
+		return [
+			_decoder.submit(_checked, decode_strokes, c, self.tool_names, base, self.dropped, self.version)
+			for base, c in self.stroke_chunks
+		]
+
+	def submit_pictures(self):
+		from .images import decode_picture
+
+		return {id: _decoder.submit(_checked, decode_picture, c) for id, c in self.picture_chunks.items()}
+
+	def close(self):
+		self.stroke_chunks = []
+		self.tile_chunks = {}
+		self.picture_chunks = {}
+		try:
+			self.map.close()
+		except BufferError:
+			pass  # a cancelled decode still holds a slice; the map goes with it
+
+
+def _checked(decode, *args):
+	"""``decode(*args)``, with whatever a damaged payload makes it raise
+	reported as a BoardFormatError."""
+	try:
+		return decode(*args)
+	except BoardFormatError:
+		raise
+	except (struct.error, ValueError, IndexError) as e:
+		raise BoardFormatError(f"damaged chunk: {e}") from e
+
+
+def _decode_names(payload):
+	b = bytes(payload)
+	n = int(decode_varints(b[:1])[0])  # fewer than 128 tools
+	names = []
+	pos = 1
+	for _ in range(n):
+		length = b[pos]
+		names.append(b[pos + 1:pos + 1 + length].decode())
+		pos += 1 + length
+	return names
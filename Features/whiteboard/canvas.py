@@ -0,0 +1,177 @@
+import itertools
+import math
+from collections import OrderedDict
+
+import numpy as np
+from PySide6.QtCore import Qt, QRect
+from PySide6.QtGui import QImage, QPainter, QPixmap
+
+TILE_SIZE = 256
+
+# Shared by every canvas, so a version never means the same thing twice
+_versions = itertools.count(1)
+
+
+def tile_rect(key):
+	tx, ty = key
+	return QRect(tx * TILE_SIZE, ty * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+
+
+def tiles_in_rect(rect):
+	if rect.isEmpty():
+		return []
+	return [
+		(tx, ty)
+		for ty in range(rect.top() // TILE_SIZE, rect.bottom() // TILE_SIZE + 1)
+		for tx in range(rect.left() // TILE_SIZE, rect.right() // TILE_SIZE + 1)
+	]
+
+
+def tiles_along(points, pad, size=TILE_SIZE):
+	"""Keys of the ``size`` cells a polyline of flat ``x, y`` pairs passes through.
+
+	Unlike the stroke's bounding box this skips tiles that a long diagonal
+	stroke never crosses, so they are not allocated for nothing.
+	"""
+	pts = np.asarray(points, dtype=np.float64)
+	pts = pts[:len(pts) // 2 * 2].reshape(-1, 2)
+	if not len(pts):
+		return set()
+	a, b = (pts[:-1], pts[1:]) if len(pts) > 1 else (pts, pts)
+	lo, hi = np.minimum(a, b), np.maximum(a, b)
+	bands = np.empty((len(a), 4), dtype=np.int64)
+	bands[:, 0] = np.floor_divide(lo[:, 0] - pad, size)
+	bands[:, 1] = np.floor_divide(hi[:, 0] + pad, size)
+	bands[:, 2] = np.floor_divide(lo[:, 1] - pad, size)
+	bands[:, 3] = np.floor_divide(hi[:, 1] + pad, size)
+	keys = set()
+	# Neighbouring segments mostly fall in the same cells
+	for tx0, tx1, ty0, ty1 in set(map(tuple, bands.tolist())):
+		for ty in range(ty0, ty1 + 1):
+			keys.update((tx, ty) for tx in range(tx0, tx1 + 1))
+	return keys
+
+
+def tiles_along_runs(points, pad, size=TILE_SIZE):
+	"""Keys of the ``size`` cells covered by fill runs ``x0, y, x1, y``.
+
+	A fill has tens of thousands of runs but covers few cells, so the runs
+	are marked on a grid of those cells the way render_spans marks pixels,
+	and the keys read back from it.
+	"""
+	runs = np.frombuffer(points, dtype=np.float32).reshape(-1, 4)
+	if not len(runs):
+		return set()
+	tx0 = np.floor_divide(runs[:, 0] - pad, size).astype(np.int64)
+	tx1 = np.floor_divide(runs[:, 2] + pad, size).astype(np.int64)
+	ty0 = np.floor_divide(runs[:, 1] - pad, size).astype(np.int64)
+	ty1 = np.floor_divide(runs[:, 1] + 1 + pad, size).astype(np.int64)
+	left, top = int(tx0.min()), int(ty0.min())
+	w, h = int(tx1.max()) - left + 1, int(ty1.max()) - top + 1
+	edges = np.zeros(h * (w + 1), dtype=np.int64)
+	for d in range(int((ty1 - ty0).max()) + 1):
+		# A run reaches into a band of rows only as far as its pad does
+		rows = ty0 + d
+		on = rows <= ty1
+		at = (rows[on] - top) * (w + 1)
+		edges += np.bincount(at + tx0[on] - left, minlength=len(edges))
+		edges -= np.bincount(at + tx1[on] + 1 - left, minlength=len(edges))
+	ys, xs = np.nonzero(np.cumsum(edges.reshape(h, w + 1), axis=1)[:, :w] > 0)
+	return set(zip((xs + left).tolist(), (ys + top).tolist()))
+
+
+class TiledCanvas:
+	"""Unbounded raster stored as a sparse grid of TILE_SIZE tiles.
+
+	A tile is only allocated the first time something is painted on it, so
+	memory follows the drawn area. ``versions`` gets a fresh number on every
+	change and lets caches of derived images notice stale entries without
+	callbacks, even across canvases.
+	"""
+
+	def __init__(self):
+		self.tiles = {}
+		self.versions = {}
+
+	@property
+	def nbytes(self):
+		return sum(t.sizeInBytes() for t in self.tiles.values())
+
+	def tile(self, key, create=False):
+		img = self.tiles.get(key)
+		if img is None and create:
+			img = QImage(TILE_SIZE, TILE_SIZE, QImage.Format_ARGB32_Premultiplied)
+			img.fill(Qt.transparent)
+			self.tiles[key] = img
+		return img
+
+	def set_tile(self, key, img):
+		if img is None:
+			self.tiles.pop(key, None)
+		else:
+			self.tiles[key] = img
+		self.versions[key] = next(_versions)
+
+	def clear(self):
+		for key in self.tiles:
+			self.versions[key] = next(_versions)
+		self.tiles.clear()
+
+	def paint(self, rect, draw, create=True, keys=None):
+		"""Call ``draw(painter)`` in world coordinates on every tile under ``rect``.
+
+		``keys`` narrows the tiles to paint when the caller knows better.
+		"""
+		for key in keys if keys is not None else tiles_in_rect(rect):
+			img = self.tile(key, create)
+			if img is None:
+				continue
+			p = QPainter(img)
+			p.setRenderHint(QPainter.Antialiasing, True)
+			p.translate(-key[0] * TILE_SIZE, -key[1] * TILE_SIZE)
+			draw(p)
+			p.end()
+			self.versions[key] = next(_versions)
+
+
+class TileCache:
+	"""LRU cache of tiles pre-scaled for a zoom level, bounded in bytes."""
+
+	def __init__(self, max_bytes=96 * 1024 * 1024):
+		self.max_bytes = max_bytes
+		self.nbytes = 0
+		self._items = OrderedDict()  # (zoom, key) -> (version, pixmap)
+
+	def pixmap(self, canvas, key, zoom, size):
+		ck = (zoom, key)
+		version = canvas.versions.get(key, 0)
+		hit = self._items.get(ck)
+		if hit is not None and hit[0] == version:
+			self._items.move_to_end(ck)
+			return hit[1]
+
+		pix = QPixmap.fromImage(canvas.tiles[key].scaled(
+			size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation
+		))
+		if hit is not None:
+			self.nbytes -= _pixmap_bytes(hit[1])
+		self._items[ck] = (version, pix)
+		self._items.move_to_end(ck)
+		self.nbytes += _pixmap_bytes(pix)
+		while self.nbytes > self.max_bytes and len(self._items) > 1:
+			_, (_, old) = self._items.popitem(last=False)
+			self.nbytes -= _pixmap_bytes(old)
+		return pix
+
+
+def _pixmap_bytes(pix):
+	return pix.width() * pix.height() * 4
+
+
+def zoom_span(index, zoom):
+	"""Pixel span of tile column/row ``index`` at ``zoom`` in zoomed space.
+
+	Edges are floored independently so neighbouring tiles never leave gaps.
+	"""
+	start = math.floor(index * TILE_SIZE * zoom)
+	return start, math.floor((index + 1) * TILE_SIZE * zoom) - start
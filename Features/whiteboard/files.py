@@ -0,0 +1,217 @@
+import os
+from concurrent.futures import wait
+
+from PySide6.QtCore import QPoint, QTimer
+from PySide6.QtWidgets import QFileDialog, QMessageBox
+
+from .board_file import BoardFormatError, BoardReader, write_board
+from .canvas import tile_rect, tiles_in_rect
+from .images import ImageStroke
+from .strokes import Stroke
+
+FILE_FILTER = "XpoFlow boards (*.xpf)"
+RASTER_TILES_PER_TICK = 16
+
+
+class _BoardLoad:
+	__slots__ = ("path", "reader", "pictures", "strokes", "tiles", "raster", "raster_keys")
+
+	def __init__(self, path, reader, pictures, strokes, tiles, raster):
+		self.path = path
+		self.reader = reader
+		self.pictures = pictures  # id -> future Picture
+		self.strokes = strokes  # futures, applied strictly in file order
+		self.tiles = tiles  # [(key, future)]
+		self.raster = raster  # no tile cache: tiles are drawn from the strokes
+		self.raster_keys = set()  # (layer id, key)
+
+
+class BoardFileMixin:
+	"""Saving and progressive loading of ``.xpf`` board files.
+
+	A load paints the tiles under the saved viewport straight from the file
+	and hands everything else to the decode pool. Results are picked up by a
+	timer on the GUI thread, so the board is usable while the rest streams
+	in; drawing waits until it is complete.
+
+	Saves store strokes only unless ``save_tile_cache`` is set. The PNG tile
+	cache makes opening faster, but it is encoded on the GUI thread and
+	can make the file ten times larger.
+	"""
+
+	save_tile_cache = False
+
+	def __init__(self):
+		super().__init__()
+		self.board_path = None
+		self._load = None
+		self._load_timer = None
+
+	@property
+	def loading(self):
+		return self._load is not None
+
+	def save_board(self, path=None):
+		path = path or self.board_path
+		if not path:
+			path, _ = QFileDialog.getSaveFileName(self, "Save Board", "", FILE_FILTER)
+			if not path:
+				return
+		self._finish_load()
+		tmp = path + ".tmp"
+		try:
+			with open(tmp, "wb") as f:
+				write_board(
+					f, self.strokes, self.layers.tiles() if self.save_tile_cache else None,
+					(self.zoom, self.pan.x(), self.pan.y()),
+					self.layers.structure(), self.layers.active.id,
+				)
+			os.replace(tmp, path)
+		except BaseException:
+			try:
+				os.remove(tmp)
+			except OSError:
+				pass
+			raise
+		self.board_path = path
+
+	def open_board(self):
+		path, _ = QFileDialog.getOpenFileName(self, "Open Board", "", FILE_FILTER)
+		if not path:
+			return
+		try:
+			self.load_board(path)
+		except (OSError, BoardFormatError) as e:
+			QMessageBox.warning(self, "Open Board", f"Could not open {path}:\n{e}")
+
+	def load_board(self, path, remember=True):
+		reader = BoardReader(path)
+		self.cancel_fill()
+		self._cancel_load()
+		self.history.clear()
+		self._pending = None
+		self._swap_strokes(self.strokes, ())
+		self.layers.clear()
+		for id, name, visible, opacity in reader.layers or [(0, None, True, 1.0)]:
+			self.layers.add(name, id=id, visible=visible, opacity=opacity)
+		self.layers.active = self.layers.get(reader.active_layer) or self.layers.layers[-1]
+		self._layout_layers()
+		self.board_path = path if remember else None
+		if reader.view is not None:
+			zoom, px, py = reader.view
+			self.zoom = zoom
+			self.pan = QPoint(px, py)
+
+		on_screen = set(tiles_in_rect(self.world_rect(self.rect())))
+		visible = {k for k in reader.tile_chunks if k[1] in on_screen}
+		for id, key in visible:
+			self._load_tile(id, key, reader.tile((id, key)))
+		rest = [k for k in reader.tile_chunks if k not in visible]
+		self._load = _BoardLoad(
+			path, reader, reader.submit_pictures(), reader.submit_strokes(),
+			reader.submit_tiles(rest), not reader.tile_chunks,
+		)
+		if self._load_timer is None:
+			self._load_timer = QTimer(self)
+			self._load_timer.timeout.connect(self._poll_load)
+		self._load_timer.start(0)
+		self.update()
+
+	def _poll_load(self):
+		load = self._load
+		if load is None:
+			self._load_timer.stop()
+			return
+		try:
+			self._poll_load_step(load)
+		except BoardFormatError as e:
+			self._cancel_load()
+			self._load_timer.stop()
+			self._settle_load()
+			if load.path == self.board_path:
+				self.board_path = None  # a save would overwrite the rest of the file
+			QMessageBox.warning(self, "Open Board", f"Could not open {load.path}:\n{e}")
+
+	def _poll_load_step(self, load):
+		waiting = []
+		for (id, key), fut in load.tiles:
+			if fut.done():
+				self._load_tile(id, key, fut.result())
+				self.update(self.view_rect(tile_rect(key)))
+			else:
+				waiting.append(((id, key), fut))
+		load.tiles = waiting
+
+		# Stroke order is drawing order, so a batch only lands once every
+		# batch before it has, and the pictures they may show are decoded
+		pictures = all(f.done() for f in load.pictures.values())
+		visible = set(tiles_in_rect(self.world_rect(self.rect()))) if load.raster else ()
+		while pictures and load.strokes and load.strokes[0].done():
+			batch = [self._loaded_stroke(load, *args) for args in load.strokes.pop(0).result()]
+			self._swap_strokes((), batch)
+			if load.raster:
+				# Everything under these strokes has landed already, so tiles on
+				# screen are drawn on as they come and the rest later from scratch
+				for stroke in batch:
+					keys = stroke.tiles(2)
+					shown = [key for key in keys if key in visible]
+					layer = self.layers.get(stroke.layer)
+					if shown and layer is not None:
+						layer.canvas.paint(stroke.bounds().toAlignedRect(), stroke.render, keys=shown)
+						self.update(self.view_rect(stroke.bounds().toAlignedRect()))
+					load.raster_keys.update((stroke.layer, key) for key in keys if key not in visible)
+
+		if load.raster and not load.strokes and load.raster_keys:
+			# Tiles on screen first, then the rest a few per tick. The view may
+			# have moved since the strokes landed
+			visible = set(tiles_in_rect(self.world_rect(self.rect())))
+			keys = sorted(load.raster_keys, key=lambda k: k[1] not in visible)[:RASTER_TILES_PER_TICK]
+			load.raster_keys.difference_update(keys)
+			for id, key in keys:
+				layer = self.layers.get(id)
+				if layer is not None:
+					self._rerender_tiles([key], layer)
+				self.update(self.view_rect(tile_rect(key)))
+
+		if not (load.tiles or load.strokes or load.raster_keys):
+			self._load = None
+			self._load_timer.stop()
+			load.reader.close()
+			self._settle_load()
+
+	def _settle_load(self):
+		# The autosave file no longer matches this board stroke for stroke,
+		# and replay starts from the loaded board
+		self._autosave_rebase()
+		self.schedule_autosave()
+		self.timeline.reset(self.strokes, self.layers)
+
+	def _loaded_stroke(self, load, tool, color, width, points, layer):
+		if tool == "image":
+			if color not in load.pictures:
+				raise BoardFormatError(f"picture {color} is missing")
+			return ImageStroke(load.pictures[color].result(), points, layer)
+		return Stroke(tool, color, width, points, layer)
+
+	def _load_tile(self, id, key, img):
+		layer = self.layers.get(id)
+		if layer is not None:
+			layer.canvas.set_tile(key, img)
+
+	def _finish_load(self):
+		while self._load is not None:
+			wait(
+				list(self._load.pictures.values()) + self._load.strokes
+				+ [f for _, f in self._load.tiles]
+			)
+			self._poll_load()
+
+	def _cancel_load(self):
+		load, self._load = self._load, None
+		if load is None:
+			return
+		for fut in [*load.pictures.values(), *load.strokes]:
+			fut.cancel()
+		for _, fut in load.tiles:
+			fut.cancel()
+		load.reader.close()
@@ -0,0 +1,215 @@
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PySide6.QtCore import Qt, QRect, QRectF, QTimer
+from PySide6.QtGui import QColor, QPainter
+
+from .canvas import TILE_SIZE, tiles_in_rect
+from .strokes import Stroke
+
+MAX_FILL = 4096  # a fill never reaches further than this from where it starts
+MAX_TOLERANCE = 128  # per channel, on the fill tool's slider
+SYNC_PIXELS = 1 << 20  # regions larger than this are filled off the GUI thread
+
+_filler = ThreadPoolExecutor(max_workers=1, thread_name_prefix="board-fill")
+
+
+def gather(canvas, rect):
+	"""Copy the pixels of ``rect`` out of the tiles into one (h, w) uint32 array.
+
+	Tiles are read through views of their own buffers; missing tiles are
+	left transparent.
+	"""
+	out = np.zeros((rect.height(), rect.width()), dtype=np.uint32)
+	for key in tiles_in_rect(rect):
+		img = canvas.tiles.get(key)
+		if img is None:
+			continue
+		tile = np.frombuffer(img.constBits(), dtype=np.uint32).reshape(TILE_SIZE, TILE_SIZE)
+		tx, ty = key[0] * TILE_SIZE, key[1] * TILE_SIZE
+		x0, y0 = max(tx, rect.left()), max(ty, rect.top())
+		x1, y1 = min(tx + TILE_SIZE, rect.right() + 1), min(ty + TILE_SIZE, rect.bottom() + 1)
+		out[y0 - rect.top():y1 - rect.top(), x0 - rect.left():x1 - rect.left()] = tile[y0 - ty:y1 - ty, x0 - tx:x1 - tx]
+	return out
+
+
+def similar(pixels, seed, tolerance):
+	"""Pixels within ``tolerance`` of ``seed`` on every channel."""
+	if tolerance <= 0:
+		return pixels == seed
+	# One byte per channel, each row read as a flat run of bytes so the
+	# compares below stream through memory instead of looping over 4 values
+	channels = pixels.view(np.uint8)
+	ref = np.frombuffer(np.uint32(seed).tobytes(), dtype=np.uint8).astype(np.int16)
+	lo = np.clip(ref - tolerance, 0, 255).astype(np.uint8)
+	hi = np.clip(ref + tolerance, 0, 255).astype(np.uint8)
+	w = pixels.shape[1]
+	# Unsigned wrap-around turns lo <= c <= hi into a single compare
+	ok = (channels - np.tile(lo, w)) <= np.tile(hi - lo, w)
+	# Four one-byte booleans read as one word are all set only if it is 0x01010101
+	return ok.view(np.uint32) == 0x01010101
+
+
+class Progress:
+	__slots__ = ("done", "cancelled")
+
+	def __init__(self):
+		self.done = 0.0
+		self.cancelled = False
+
+
+def flood_fill(pixels, x, y, tolerance=0, progress=None):
+	"""Scanline flood fill from (x, y); returns the filled runs as (ys, x0s, x1s).
+
+	Every row is cut into runs of pixels close enough to the seed colour in
+	one vectorized pass. The fill is then a search over runs rather than
+	pixels: a run joins the fill when it overlaps, column-wise, a filled run
+	in the row above or below.
+	"""
+	h, w = pixels.shape
+	match = np.zeros((h, w + 2), dtype=np.int8)
+	match[:, 1:-1] = similar(pixels, pixels[y, x], tolerance)
+	rows, cols = np.nonzero(np.diff(match, axis=1))
+	run_rows = rows[0::2]
+	starts = cols[0::2].tolist()
+	ends = cols[1::2].tolist()
+	first = np.searchsorted(run_rows, np.arange(h + 1)).tolist()
+	run_rows = run_rows.tolist()
+
+	seed = bisect_right(starts, x, first[y], first[y + 1]) - 1
+	filled = [seed]
+	seen = {seed}
+	stack = [seed]
+	total = len(starts)
+	while stack:
+		i = stack.pop()
+		r, s, e = run_rows[i], starts[i], ends[i]
+		for nr in (r - 1, r + 1):
+			if nr < 0 or nr >= h:
+				continue
+			a, b = first[nr], first[nr + 1]
+			for j in range(bisect_right(ends, s, a, b), bisect_left(starts, e, a, b)):
+				if j not in seen:
+					seen.add(j)
+					filled.append(j)
+					stack.append(j)
+		if progress is not None and not len(filled) & 1023:
+			if progress.cancelled:
+				return None
+			progress.done = len(filled) / total
+
+	filled.sort()
+	idx = np.array(filled)
+	return (
+		np.asarray(run_rows)[idx], np.asarray(starts)[idx], np.asarray(ends)[idx],
+	)
+
+
+def span_points(spans, left, top):
+	ys, x0s, x1s = spans
+	pts = np.empty((len(ys), 4), dtype=np.float32)
+	pts[:, 0] = x0s + left
+	pts[:, 1] = ys + top
+	pts[:, 2] = x1s + left
+	pts[:, 3] = ys + top
+	out = array("f")
+	out.frombytes(pts.tobytes())
+	return out
+
+
+class FillMixin:
+	"""Bucket fill on the active layer.
+
+	The fill reaches across the visible part of the board (at most MAX_FILL
+	pixels from the click) and is kept in the stroke log as the runs it
+	covered, so it survives the stroke eraser, saving and replay like any
+	other stroke. Regions over SYNC_PIXELS are filled on a worker thread
+	while a bar over the toolbar shows how far along it is; Esc cancels
+	them.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self.fill_tolerance = 32
+		self._fill = None  # (future, progress, region, color, layer)
+		self._fill_timer = None
+
+	@property
+	def filling(self):
+		return self._fill is not None
+
+	def set_fill(self):
+		# Like the pen, a second click shows the slider; for the fill it sets
+		# the tolerance
+		if self.active_tool == "fill":
+			self.slider_visible = not self.slider_visible
+		else:
+			self.active_tool = "fill"
+			self.slider_visible = False
+		self.update()
+
+	def start_fill(self, pos):
+		x, y = math.floor(pos.x()), math.floor(pos.y())
+		half = MAX_FILL // 2
+		region = self.world_rect(self.rect()).intersected(QRect(x - half, y - half, MAX_FILL, MAX_FILL))
+		if not region.contains(x, y) or self.filling:
+			return
+		pixels = gather(self.canvas, region)
+		sx, sy = x - region.left(), y - region.top()
+		color = self.pen_color.rgba()
+		if pixels.size <= SYNC_PIXELS:
+			self._commit_fill(flood_fill(pixels, sx, sy, self.fill_tolerance), region, color, self.layers.active.id)
+			return
+
+		progress = Progress()
+		future = _filler.submit(flood_fill, pixels, sx, sy, self.fill_tolerance, progress)
+		self._fill = (future, progress, region, color, self.layers.active.id)
+		if self._fill_timer is None:
+			self._fill_timer = QTimer(self)
+			self._fill_timer.timeout.connect(self._poll_fill)
+		self._fill_timer.start(30)
+
+	def _poll_fill(self):
+		future, progress, region, color, layer = self._fill
+		self.update(self._fill_bar_rect().toAlignedRect().adjusted(-2, -2, 2, 2))
+		if not future.done():
+			return
+		self._fill_timer.stop()
+		self._fill = None
+		spans = future.result()
+		if spans is not None:
+			self._commit_fill(spans, region, color, layer)
+
+	def cancel_fill(self):
+		# Esc, and leaving or closing the board; the worker stops at its
+		# next check and the result is dropped
+		if self._fill is not None:
+			self._fill[1].cancelled = True
+
+	def _commit_fill(self, spans, region, color, layer):
+		# Onto the layer it was computed on, even if another is active now
+		if self.layers.get(layer) is None:
+			return
+		stroke = Stroke("fill", color, 0, span_points(spans, region.left(), region.top()), layer=layer)
+		self._add_stroke(stroke, pad=1)
+		self.update(self.view_rect(stroke.bounds().toAlignedRect()))
+
+	def _fill_bar_rect(self):
+		tb = self.toolbar_rect
+		return QRectF(tb.left() + 16, tb.top() - 14, tb.width() - 32, 4)
+
+	def _paint_fill_progress(self, p):
+		if self._fill is None:
+			return
+		bar = self._fill_bar_rect()
+		p.save()
+		p.setRenderHint(QPainter.Antialiasing, True)
+		p.setPen(Qt.NoPen)
+		p.setBrush(QColor(90, 95, 110, 240))
+		p.drawRoundedRect(bar, 2, 2)
+		p.setBrush(QColor(230, 230, 230))
+		p.drawRoundedRect(QRectF(bar.left(), bar.top(), bar.width() * self._fill[1].done, bar.height()), 2, 2)
+		p.restore()
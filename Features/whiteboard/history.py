@@ -1,22 +1,100 @@
 from PySide6.QtGui import QImage
-from PySide6.QtCore import Qt
+
+from .canvas import tiles_in_rect
+from .history_store import HistoryEntry, HistoryStore
+from .strokes import insert_stroke
+
+
+def _share(img):
+	return QImage(img) if img is not None else None
+
 
 class HistoryMixin:
-	def _push_history(self):
-		self.history.append(self.canvas.copy())
-		if len(self.history) > self.max_history:
-			self.history.pop(0)
-		self.redo_stack.clear()
+	def __init__(self):
+		super().__init__()
+		self.history = HistoryStore()
+		self._pending = None
+
+	def _begin_history(self, layer=None):
+		# A fill still running was computed from the pixels this is about to change
+		self.cancel_fill()
+		self._pending = HistoryEntry(self.layers.active.id if layer is None else layer)
+
+	def _touch_tiles(self, rect):
+		self._touch_keys(tiles_in_rect(rect))
+
+	def _touch_keys(self, keys):
+		# Keep the untouched state of every tile the next paint can change.
+		# QImage(tile) is a shallow copy: the pixels are only duplicated when
+		# the painter detaches the live tile, and absent tiles stay None.
+		entry = self._pending
+		if entry is None:
+			return
+		canvas = self.layers.get(entry.layer).canvas
+		for key in keys:
+			if key not in entry.tiles:
+				entry.tiles[key] = [_share(canvas.tiles.get(key)), None]
+
+	def _push_history(self, added=(), removed=()):
+		entry, self._pending = self._pending, None
+		if entry is None or not (entry.tiles or added or removed):
+			return
+		canvas = self.layers.get(entry.layer).canvas
+		for key, pair in entry.tiles.items():
+			pair[1] = _share(canvas.tiles.get(key))
+		entry.added = list(added)
+		entry.removed = list(removed)
+		self.history.push(entry)
+		self._settle_timeline()
+
+	def _add_stroke(self, stroke, pad=2, draw=True):
+		"""Draw a finished stroke onto its layer and log it as one undo step.
+
+		Opens the history entry unless the caller already has, as a live
+		stroke does on press.
+		"""
+		if self._pending is None:
+			self._begin_history(stroke.layer)
+		if draw:
+			keys = stroke.tiles(pad)
+			self._touch_keys(keys)
+			self.layers.get(stroke.layer).canvas.paint(stroke.bounds().toAlignedRect(), stroke.render, keys=keys)
+		self._swap_strokes((), [stroke])
+		self._push_history(added=[stroke])
+
+	def _swap_strokes(self, remove, add):
+		# The only place the stroke log changes, so the index stays in step
+		if remove:
+			gone = {s.seq for s in remove}
+			self.strokes = [s for s in self.strokes if s.seq not in gone]
+			for stroke in remove:
+				self.stroke_index.remove(stroke)
+		for stroke in add:
+			insert_stroke(self.strokes, stroke)
+			self.stroke_index.add(stroke)
+		self._log_strokes(remove, add)
+		self._record_timeline(remove, add)
+
+	def _restore_tiles(self, entry, side):
+		# Entries only ever touch one layer, which need not be the active one
+		canvas = self.layers.get(entry.layer).canvas
+		for key, pair in entry.tiles.items():
+			canvas.set_tile(key, _share(pair[side]))
 
 	def undo(self):
-		if len(self.history) > 1:
-			self.redo_stack.append(self.history.pop())
-			self.canvas = self.history[-1].copy()
+		self.cancel_fill()
+		entry = self.history.undo()
+		if entry is not None:
+			self._restore_tiles(entry, 0)
+			self._swap_strokes(entry.added, entry.removed)
+			self._settle_timeline()
 			self.update()
 
 	def redo(self):
-		if self.redo_stack:
-			img = self.redo_stack.pop()
-			self.history.append(img.copy())
-			self.canvas = img
+		self.cancel_fill()
+		entry = self.history.redo()
+		if entry is not None:
+			self._restore_tiles(entry, 1)
+			self._swap_strokes(entry.removed, entry.added)
+			self._settle_timeline()
 			self.update()
@@ -0,0 +1,244 @@
+import mmap
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtGui import QImage
+
+# zlib releases the GIL, so packing on one worker keeps the GUI thread free
+_packer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-pack")
+
+_IMAGE_HEADER = struct.Struct("<iiii")  # width, height, bytes per line, format
+
+
+def _pack(tiles):
+	parts = []
+	for before, after in tiles.values():
+		for img in (before, after):
+			if img is None:
+				parts.append(_IMAGE_HEADER.pack(0, 0, 0, 0))
+				continue
+			parts.append(_IMAGE_HEADER.pack(
+				img.width(), img.height(), img.bytesPerLine(), img.format().value
+			))
+			parts.append(bytes(img.constBits()))
+	return zlib.compress(b"".join(parts), 1)
+
+
+def _unpack(keys, blob):
+	raw = zlib.decompress(blob)
+	tiles = {}
+	pos = 0
+	for key in keys:
+		pair = []
+		for _ in range(2):
+			w, h, bpl, fmt = _IMAGE_HEADER.unpack_from(raw, pos)
+			pos += _IMAGE_HEADER.size
+			if not w:
+				pair.append(None)
+				continue
+			data = raw[pos:pos + bpl * h]
+			pos += bpl * h
+			# copy() detaches the image from the temporary buffer
+			pair.append(QImage(data, w, h, bpl, QImage.Format(fmt)).copy())
+		tiles[key] = pair
+	return tiles
+
+
+def image_bytes(tiles):
+	return sum(img.sizeInBytes() for pair in tiles.values() for img in pair if img is not None)
+
+
+class HistoryEntry:
+	"""Before/after copies of the canvas tiles changed by one action.
+
+	An entry is hot (``tiles`` holds QImages), packed (``blob`` holds the
+	zlib-compressed tiles) or spilled (``offset``/``length`` locate the blob
+	in the scratch file). Entries never change once pushed, so a blob stays
+	valid after the entry is paged back in. ``added`` and ``removed`` hold
+	the strokes the action put on or took off the board; they are small and
+	never packed. Every tile belongs to the layer with id ``layer``.
+	"""
+	__slots__ = ("tiles", "keys", "blob", "future", "offset", "length", "added", "removed", "layer")
+
+	def __init__(self, layer=0):
+		self.layer = layer
+		self.tiles = {}  # (tx, ty) -> [before, after]
+		self.added = []
+		self.removed = []
+		self.keys = None
+		self.blob = None
+		self.future = None
+		self.offset = -1
+		self.length = 0
+
+	def ram_bytes(self):
+		n = len(self.blob) if self.blob is not None else 0
+		if self.tiles is not None:
+			n += image_bytes(self.tiles)
+		return n
+
+
+class ScratchFile:
+	"""Anonymous memory-mapped file holding spilled history blobs."""
+
+	def __init__(self):
+		self.file = None
+		self.map = None
+		self.end = 0
+		self.live = 0
+
+	def write(self, blob):
+		need = self.end + len(blob)
+		if self.map is None or need > len(self.map):
+			self._grow(need)
+		offset = self.end
+		self.map[offset:need] = blob
+		self.end = need
+		self.live += len(blob)
+		return offset
+
+	def read(self, offset, length):
+		return self.map[offset:offset + length]
+
+	def free(self, offset, length):
+		self.live -= length
+		if offset + length == self.end:
+			self.end = offset
+
+	def _grow(self, need):
+		size = max(1 << 20, len(self.map) if self.map is not None else 0)
+		while size < need:
+			size *= 2
+		if self.file is None:
+			self.file = tempfile.TemporaryFile(prefix="xpoflow-history-")
+		if self.map is not None:
+			self.map.close()
+		self.file.truncate(size)
+		self.map = mmap.mmap(self.file.fileno(), size)
+
+	def compact(self, entries):
+		# Slide live blobs to the front once holes waste more than half the file
+		if self.end <= 2 * self.live:
+			return
+		pos = 0
+		for entry in sorted(entries, key=lambda e: e.offset):
+			if entry.offset != pos:
+				self.map.move(pos, entry.offset, entry.length)
+				entry.offset = pos
+			pos += entry.length
+		self.end = pos
+
+
+class HistoryStore:
+	"""Undo/redo stacks that compress cold entries and spill the oldest to disk.
+
+	The newest ``hot_entries`` of each stack stay as plain QImages. Older
+	entries are compressed on a worker thread, and once the in-memory total
+	passes ``ram_budget`` the oldest compressed entries move to a scratch
+	file. Entries beyond ``disk_budget`` are dropped, oldest first.
+	"""
+
+	def __init__(self, ram_budget=64 * 1024 * 1024, disk_budget=1024 * 1024 * 1024, hot_entries=8):
+		self.ram_budget = ram_budget
+		self.disk_budget = disk_budget
+		self.hot_entries = hot_entries
+		self.undo_stack = []
+		self.redo_stack = []
+		self.scratch = ScratchFile()
+
+	def __len__(self):
+		return len(self.undo_stack)
+
+	@property
+	def ram_bytes(self):
+		return sum(e.ram_bytes() for e in self.undo_stack + self.redo_stack)
+
+	@property
+	def disk_bytes(self):
+		return self.scratch.live
+
+	def push(self, entry):
+		entry.keys = list(entry.tiles)
+		self.undo_stack.append(entry)
+		for old in self.redo_stack:
+			self._discard(old)
+		self.redo_stack.clear()
+		self._maintain()
+
+	def undo(self):
+		return self._move(self.undo_stack, self.redo_stack)
+
+	def redo(self):
+		return self._move(self.redo_stack, self.undo_stack)
+
+	def clear(self):
+		for entry in self.undo_stack + self.redo_stack:
+			self._discard(entry)
+		self.undo_stack.clear()
+		self.redo_stack.clear()
+
+	def _move(self, src, dst):
+		if not src:
+			return None
+		entry = src.pop()
+		self._page_in(entry)
+		dst.append(entry)
+		self._maintain()
+		return entry
+
+	def _page_in(self, entry):
+		if entry.tiles is not None:
+			return
+		if entry.future is not None:
+			entry.blob = entry.future.result()
+			entry.future = None
+		if entry.blob is None:
+			entry.blob = self.scratch.read(entry.offset, entry.length)
+			self.scratch.free(entry.offset, entry.length)
+			entry.offset = -1
+		entry.tiles = _unpack(entry.keys, entry.blob)
+
+	def _discard(self, entry):
+		if entry.future is not None:
+			entry.future.cancel()
+		if entry.offset >= 0:
+			self.scratch.free(entry.offset, entry.length)
+		entry.tiles = entry.blob = entry.future = None
+		entry.added = entry.removed = None
+		entry.offset = -1
+
+	def _cold(self):
+		# Oldest first: the bottom of the undo stack, then the bottom of redo.
+		# The top of each stack is always hot so undo/redo can use it directly.
+		hot = max(1, self.hot_entries)
+		return self.undo_stack[:-hot] + self.redo_stack[:-hot]
+
+	def _maintain(self):
+		cold = self._cold()
+		for entry in cold:
+			if entry.future is not None and entry.future.done():
+				entry.blob = entry.future.result()
+				entry.future = None
+			if entry.blob is not None or entry.offset >= 0:
+				entry.tiles = None
+			elif entry.future is None:
+				entry.future = _packer.submit(_pack, entry.tiles)
+
+		ram = self.ram_bytes
+		for entry in cold:
+			if ram <= self.ram_budget:
+				break
+			if entry.blob is None or entry.tiles is not None:
+				continue
+			ram -= len(entry.blob)
+			entry.length = len(entry.blob)
+			entry.offset = self.scratch.write(entry.blob)
+			entry.blob = None
+
+		while self.scratch.live > self.disk_budget:
+			stack = self.undo_stack if self.undo_stack else self.redo_stack
+			self._discard(stack.pop(0))
+		spilled = [e for e in self.undo_stack + self.redo_stack if e.offset >= 0]
+		self.scratch.compact(spilled)
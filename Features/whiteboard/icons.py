@@ -0,0 +1,68 @@
+import math
+
+from PySide6.QtCore import Qt, QPointF, QRectF
+from PySide6.QtGui import QColor, QPainter, QPixmap
+
+
+class IconAtlas:
+	"""Toolbar button faces rasterized once into a single pixmap.
+
+	Cells are keyed by (name, size, device pixel ratio, tint, active). The
+	atlas is rebuilt only when the size, DPI or tint differs from the one it
+	was built for, or after ``invalidate()`` on a theme change.
+	"""
+
+	def __init__(self, renderers, icon_margin=12):
+		self.renderers = renderers
+		self.icon_margin = icon_margin
+		self.invalidate()
+
+	def invalidate(self):
+		self._pixmap = None
+		self._built_for = None
+		self._cells = {}
+
+	def draw(self, p, name, rect, tint, active=False, dpr=1.0):
+		size = round(rect.width())
+		if self._built_for != (size, dpr, tint.rgba()):
+			self._build(size, dpr, tint)
+		source = self._cells.get((name, size, dpr, tint.rgba(), active))
+		if source is not None:
+			p.drawPixmap(rect, self._pixmap, source)
+
+	def _build(self, size, dpr, tint):
+		names = [n for n, r in self.renderers.items() if r is not None and r.isValid()]
+		cell = math.ceil(size * dpr)
+		self._pixmap = QPixmap(cell * max(1, len(names)), cell * 2)
+		self._pixmap.fill(Qt.transparent)
+		self._cells = {}
+		self._built_for = (size, dpr, tint.rgba())
+
+		p = QPainter(self._pixmap)
+		p.setRenderHint(QPainter.Antialiasing, True)
+		p.setRenderHint(QPainter.SmoothPixmapTransform, True)
+		for col, name in enumerate(names):
+			icon = self._tinted(name, size - 2 * self.icon_margin, dpr, tint)
+			for row, active in enumerate((False, True)):
+				origin = QRectF(col * cell, row * cell, cell, cell)
+				if active:
+					p.setPen(Qt.NoPen)
+					p.setBrush(QColor(90, 160, 255, 35))
+					p.drawEllipse(origin.adjusted(4 * dpr, 4 * dpr, -4 * dpr, -4 * dpr))
+				m = self.icon_margin * dpr
+				p.drawPixmap(QPointF(origin.x() + m, origin.y() + m), icon)
+				self._cells[(name, size, dpr, tint.rgba(), active)] = origin
+		p.end()
+
+	def _tinted(self, name, size, dpr, tint):
+		px = max(1, round(size * dpr))
+		pixmap = QPixmap(px, px)
+		pixmap.fill(Qt.transparent)
+		p = QPainter(pixmap)
+		p.setRenderHint(QPainter.Antialiasing, True)
+		p.setRenderHint(QPainter.SmoothPixmapTransform, True)
+		self.renderers[name].render(p, QRectF(0, 0, px, px))
+		p.setCompositionMode(QPainter.CompositionMode_SourceIn)
+		p.fillRect(pixmap.rect(), tint)
+		p.end()
+		return pixmap
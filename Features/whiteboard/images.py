@@ -0,0 +1,210 @@
+import math
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice, QRectF, Qt, QTimer
+from PySide6.QtGui import QColor, QGuiApplication, QImage, QImageReader, QPainter
+from PySide6.QtWidgets import QMessageBox
+
+from .canvas import TILE_SIZE
+from .strokes import Stroke
+
+MAX_SIDE = 4096  # pictures are decoded and placed at most this large
+PLACE_FRACTION = 0.8  # a new picture fills at most this much of the view
+
+_importer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="board-import")
+
+
+class Picture:
+	"""A decoded image, shared by every stroke showing it.
+
+	``data`` is what gets written to board files: the source file bytes, or
+	the image re-encoded when the source had to be scaled down or came from
+	the clipboard without any. Pictures are drawn into tiles at world
+	scale and zoomed out views scale those tiles, so no smaller copies are
+	kept.
+	"""
+	__slots__ = ("data", "image")
+
+	def __init__(self, data, image):
+		self.data = data
+		self.image = image
+
+	def size(self):
+		return self.image.size()
+
+	@property
+	def nbytes(self):
+		return self.image.sizeInBytes()
+
+
+def _encode(img, fmt):
+	data = QByteArray()
+	buf = QBuffer(data)
+	buf.open(QIODevice.WriteOnly)
+	img.save(buf, fmt, 90 if fmt == "JPG" else -1)
+	buf.close()
+	return data.data()
+
+
+def decode_picture(data):
+	"""Decode encoded image bytes into a Picture; runs on any thread.
+
+	Sources larger than MAX_SIDE are scaled while decoding, which for JPEG
+	skips most of the work instead of decoding every pixel first.
+	"""
+	buf = QBuffer()
+	buf.setData(QByteArray(bytes(data)))
+	buf.open(QIODevice.ReadOnly)
+	reader = QImageReader(buf)
+	size = reader.size()
+	scaled = size.isValid() and max(size.width(), size.height()) > MAX_SIDE
+	if scaled:
+		reader.setScaledSize(size.scaled(MAX_SIDE, MAX_SIDE, Qt.KeepAspectRatio))
+	img = reader.read()
+	if img.isNull():
+		raise ValueError(reader.errorString())
+	if scaled:
+		# Photos are what get this big; PNG would take seconds and be larger
+		data = _encode(img, "PNG" if img.hasAlphaChannel() else "JPG")
+	return Picture(bytes(data), img.convertToFormat(QImage.Format_ARGB32_Premultiplied))
+
+
+def read_picture(source):
+	"""``source`` is a file path or a QImage."""
+	if isinstance(source, QImage):
+		return decode_picture(_encode(source, "PNG"))
+	with open(source, "rb") as f:
+		return decode_picture(f.read())
+
+
+class ImageStroke(Stroke):
+	"""A picture placed on the board; its points are two opposite corners."""
+	__slots__ = ("picture",)
+
+	def __init__(self, picture, points, layer=0):
+		super().__init__("image", 0, 0, points, layer)
+		self.picture = picture
+
+	def outline(self):
+		x0, y0, x1, y1 = self.points
+		return array("f", (x0, y0, x1, y0, x1, y1, x0, y1, x0, y0))
+
+	def tiles(self, pad, size=TILE_SIZE):
+		# Unlike a shape the picture covers everything inside its outline
+		r = self.bounds().adjusted(-pad, -pad, pad, pad)
+		return {
+			(tx, ty)
+			for tx in range(int(r.left() // size), int(r.right() // size) + 1)
+			for ty in range(int(r.top() // size), int(r.bottom() // size) + 1)
+		}
+
+	def render(self, p):
+		x0, y0, x1, y1 = self.points
+		target = QRectF(x0, y0, x1 - x0, y1 - y0)
+		inv, _ = p.worldTransform().inverted()
+		device = p.device()
+		shown = target.intersected(inv.mapRect(QRectF(0, 0, device.width(), device.height())))
+		if shown.isEmpty():
+			return
+		# Only the part of the picture the painter can reach is sampled
+		img = self.picture.image
+		sx, sy = img.width() / target.width(), img.height() / target.height()
+		source = QRectF(
+			(shown.left() - x0) * sx, (shown.top() - y0) * sy, shown.width() * sx, shown.height() * sy,
+		)
+		out = p.worldTransform().mapRect(shown)
+		if out.width() * 2 < source.width():
+			# Drawn well below its size (rasterize at a small scale): bilinear
+			# sampling alone would alias, so shrink that part properly first
+			img = img.copy(source.toAlignedRect()).scaled(
+				max(1, math.ceil(out.width())), max(1, math.ceil(out.height())),
+				Qt.IgnoreAspectRatio, Qt.SmoothTransformation,
+			)
+			source = QRectF(img.rect())
+		p.setCompositionMode(QPainter.CompositionMode_SourceOver)
+		p.setRenderHint(QPainter.SmoothPixmapTransform, True)
+		p.drawImage(shown, img, source)
+
+
+class ImagesMixin:
+	"""Pictures dropped or pasted (Ctrl+V) onto the board.
+
+	Files are read and decoded on a worker pool, so a huge image never
+	stalls drawing; a label marks where each one will land until it does.
+	A placed picture is an ImageStroke on the active layer, drawn into the
+	tiles like any other stroke.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self._imports = []  # (future, world position)
+		self._import_timer = None
+
+	def import_image(self, source, pos):
+		self._imports.append((_importer.submit(read_picture, source), pos))
+		if self._import_timer is None:
+			self._import_timer = QTimer(self)
+			self._import_timer.timeout.connect(self._poll_imports)
+		self._import_timer.start(30)
+		self.update()
+
+	def paste_image(self):
+		mime = QGuiApplication.clipboard().mimeData()
+		self._import_mime(mime, self.to_world(self.rect().center()))
+
+	def _import_mime(self, mime, pos):
+		paths = [url.toLocalFile() for url in mime.urls() if url.isLocalFile()]
+		if paths:
+			for path in paths:
+				self.import_image(path, pos)
+		elif mime.hasImage():
+			self.import_image(QImage(mime.imageData()), pos)
+		else:
+			return False
+		return True
+
+	def _poll_imports(self):
+		if self.loading or self.filling:
+			return  # placed once the board settles
+		waiting = []
+		for fut, pos in self._imports:
+			if not fut.done():
+				waiting.append((fut, pos))
+				continue
+			try:
+				self._place_picture(fut.result(), pos)
+			except (OSError, ValueError) as e:
+				QMessageBox.warning(self, "Import Image", f"Could not import image:\n{e}")
+		self._imports = waiting
+		if not waiting:
+			self._import_timer.stop()
+		self.update()
+
+	def _place_picture(self, picture, pos):
+		# Native size, shrunk to fit the view and centred where it was dropped
+		size = picture.size()
+		view = self.world_rect(self.rect())
+		fit = min(
+			1.0, PLACE_FRACTION * view.width() / size.width(),
+			PLACE_FRACTION * view.height() / size.height(), MAX_SIDE / max(size.width(), size.height()),
+		)
+		w, h = size.width() * fit, size.height() * fit
+		x, y = round(pos.x() - w / 2), round(pos.y() - h / 2)
+		stroke = ImageStroke(picture, array("f", (x, y, x + w, y + h)), self.layers.active.id)
+		self._add_stroke(stroke)
+
+	def _paint_imports(self, p):
+		if not self._imports:
+			return
+		p.save()
+		p.setRenderHint(QPainter.Antialiasing, True)
+		for _, pos in self._imports:
+			x, y = pos.x() * self.zoom - self.pan.x(), pos.y() * self.zoom - self.pan.y()
+			r = QRectF(x - 70, y - 14, 140, 28)
+			p.setPen(Qt.NoPen)
+			p.setBrush(QColor(40, 44, 52, 220))
+			p.drawRoundedRect(r, 8, 8)
+			p.setPen(QColor(230, 230, 230))
+			p.drawText(r, Qt.AlignCenter, "Importing image…")
+		p.restore()
@@ -0,0 +1,225 @@
+"""Opt-in frame and input-latency instrumentation for the whiteboard.
+
+Set ``XPOFLOW_INSTRUMENT=1`` before starting the app. The Whiteboard class
+is then swapped for a subclass that times input, flushes, paints and
+history operations, shows a HUD in the top left corner and appends a JSON
+line per second to LOG_FILE (rotated at 1 MB). Without the variable none
+of this is imported into the paint or input paths.
+"""
+import json
+import logging
+import os
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from PySide6.QtCore import QRectF, Qt, QTimer
+from PySide6.QtGui import QColor, QPainter
+
+from .canvas import TiledCanvas
+
+ENABLED = os.environ.get("XPOFLOW_INSTRUMENT", "") not in ("", "0")
+LOG_FILE = Path.home() / ".xpoflow" / "instrument.log"
+TICK_MS = 1000
+WINDOW = 512  # samples kept per metric
+
+_painters = 0  # tile painters opened by TiledCanvas.paint, ever
+
+
+class Series:
+	def __init__(self):
+		self.samples = deque(maxlen=WINDOW)
+
+	def add(self, value):
+		self.samples.append(value)
+
+	def summary(self):
+		if not self.samples:
+			return None
+		s = sorted(self.samples)
+		return {
+			"p50": round(s[len(s) // 2], 3),
+			"p95": round(s[min(len(s) - 1, int(len(s) * 0.95))], 3),
+			"max": round(s[-1], 3),
+		}
+
+
+class Instrument:
+	"""What one board has measured since the last tick."""
+
+	def __init__(self, board):
+		self.board = board
+		self.inputs = []  # perf_counter of pointer events not yet on screen
+		self.latency = Series()  # ms from pointer event to the end of the paint showing it
+		self.paint = Series()
+		self.flush = Series()
+		self.history = Series()
+		self.painters = Series()  # tile painters opened per frame, in input handlers too
+		self._painters_seen = _painters
+		self.frames = 0
+		self.last = {}
+		self.hud_rect = QRectF(16, 16, 248, 118)
+		self._tick = time.monotonic()
+		self._timer = None
+		self.log = _logger()
+
+	def start(self):
+		self._timer = QTimer(self.board)
+		self._timer.timeout.connect(self.tick)
+		self._timer.start(TICK_MS)
+
+	def painted(self, ms):
+		now = time.perf_counter()
+		self.paint.add(ms)
+		self.painters.add(_painters - self._painters_seen)
+		self._painters_seen = _painters
+		self.frames += 1
+		if self.inputs and not self.board._queued:
+			# Nothing is waiting for the frame flush, so this paint shows them
+			for t in self.inputs:
+				self.latency.add((now - t) * 1e3)
+			self.inputs = []
+
+	def tick(self):
+		now = time.monotonic()
+		board = self.board
+		canvas = sum(l.canvas.nbytes for l in board.layers) + board.layers.composite.nbytes
+		self.last = {
+			"t": round(time.time(), 3),
+			"fps": round(self.frames / max(now - self._tick, 1e-6), 1),
+			"paint_ms": self.paint.summary(),
+			"latency_ms": self.latency.summary(),
+			"flush_ms": self.flush.summary(),
+			"history_ms": self.history.summary(),
+			"painters": self.painters.summary(),
+			"canvas_bytes": canvas,
+			"history_ram_bytes": board.history.ram_bytes,
+			"history_disk_bytes": board.history.disk_bytes,
+			"strokes": len(board.strokes),
+		}
+		self.frames = 0
+		self._tick = now
+		if self.log is not None:
+			self.log.info(json.dumps(self.last))
+		board.update(self.hud_rect.toAlignedRect())
+
+	def paint_hud(self, p):
+		s = self.last
+		if not s:
+			return
+
+		def q(name, key="p95"):
+			v = s.get(name)
+			return "-" if v is None else f"{v[key]:.1f}"
+
+		lines = (
+			f"{s['fps']:.0f} fps   paint {q('paint_ms', 'p50')}/{q('paint_ms')} ms",
+			f"ink latency {q('latency_ms', 'p50')}/{q('latency_ms')}/{q('latency_ms', 'max')} ms",
+			f"flush {q('flush_ms')} ms   history {q('history_ms')} ms",
+			f"painters/frame {q('painters', 'p50')}/{q('painters', 'max')}",
+			f"canvas {s['canvas_bytes'] / 2**20:.1f} MB   {s['strokes']} strokes",
+			f"history {s['history_ram_bytes'] / 2**20:.1f} MB ram, {s['history_disk_bytes'] / 2**20:.1f} MB disk",
+		)
+		p.save()
+		p.setPen(Qt.NoPen)
+		p.setBrush(QColor(0, 0, 0, 170))
+		p.drawRoundedRect(self.hud_rect, 8, 8)
+		p.setPen(QColor(120, 255, 160))
+		for i, line in enumerate(lines):
+			p.drawText(QRectF(self.hud_rect.left() + 10, self.hud_rect.top() + 8 + i * 17, 240, 17), Qt.AlignLeft, line)
+		p.restore()
+
+
+def _logger():
+	log = logging.getLogger("xpoflow.instrument")
+	if not log.handlers:
+		try:
+			LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+			handler = RotatingFileHandler(LOG_FILE, maxBytes=1 << 20, backupCount=3)
+		except OSError:
+			return None
+		handler.setFormatter(logging.Formatter("%(message)s"))
+		log.addHandler(handler)
+		log.setLevel(logging.INFO)
+		log.propagate = False
+	return log
+
+
+def _count_painters():
+	paint = TiledCanvas.paint
+
+	def counted(self, rect, draw, create=True, keys=None):
+		def opened(p):
+			global _painters
+			_painters += 1
+			draw(p)
+
+		return paint(self, rect, opened, create, keys)
+
+	TiledCanvas.paint = counted
+
+
+def instrumented(cls):
+	"""A subclass of the Whiteboard ``cls`` that reports to an Instrument."""
+	_count_painters()
+
+	def timed(series, fn, *args, **kwargs):
+		t = time.perf_counter()
+		try:
+			return fn(*args, **kwargs)
+		finally:
+			series.add((time.perf_counter() - t) * 1e3)
+
+	class Instrumented(cls):
+		def __init__(self, *args, **kwargs):
+			self.instrument = None  # mixins may paint or flush during __init__
+			super().__init__(*args, **kwargs)
+			self.instrument = Instrument(self)
+			self.instrument.start()
+
+		def mousePressEvent(self, e):
+			if self.instrument is not None:
+				self.instrument.inputs.append(time.perf_counter())
+			super().mousePressEvent(e)
+
+		def mouseMoveEvent(self, e):
+			if self.instrument is not None and e.buttons():
+				self.instrument.inputs.append(time.perf_counter())
+			super().mouseMoveEvent(e)
+
+		def _flush_points(self):
+			if self.instrument is None:
+				return super()._flush_points()
+			return timed(self.instrument.flush, super()._flush_points)
+
+		def _push_history(self, *args, **kwargs):
+			if self.instrument is None:
+				return super()._push_history(*args, **kwargs)
+			return timed(self.instrument.history, super()._push_history, *args, **kwargs)
+
+		def undo(self):
+			return timed(self.instrument.history, super().undo)
+
+		def redo(self):
+			return timed(self.instrument.history, super().redo)
+
+		def paintEvent(self, e):
+			if self.instrument is None:
+				return super().paintEvent(e)
+			t = time.perf_counter()
+			super().paintEvent(e)
+			self.instrument.painted((time.perf_counter() - t) * 1e3)
+			if self.instrument.hud_rect.intersects(QRectF(e.rect())):
+				p = QPainter(self)
+				p.setClipRegion(e.region())
+				self.instrument.paint_hud(p)
+				p.end()
+
+		def closeEvent(self, e):
+			if self.instrument is not None:
+				self.instrument._timer.stop()
+			super().closeEvent(e)
+
+	Instrumented.__name__ = Instrumented.__qualname__ = cls.__name__
+	return Instrumented
@@ -0,0 +1,231 @@
+from PySide6.QtCore import Qt, QPoint, QRectF
+from PySide6.QtGui import QColor, QImage, QPainter
+
+from .canvas import TILE_SIZE, TiledCanvas
+
+
+class Layer:
+	__slots__ = ("id", "name", "canvas", "visible", "opacity")
+
+	def __init__(self, id, name, visible=True, opacity=1.0):
+		self.id = id
+		self.name = name
+		self.canvas = TiledCanvas()
+		self.visible = visible
+		self.opacity = opacity
+
+
+class LayerStack:
+	"""Layers from bottom to top and a tile cache of what they add up to.
+
+	``composite`` is a TiledCanvas like any other, so the view and its zoom
+	cache work on it unchanged. A composite tile is rebuilt only when the
+	visible layers under it, their order, opacity or tile versions differ
+	from the last build, so hiding a layer or drawing on one leaves every
+	tile it does not cover alone. A tile covered by a single opaque layer
+	is shared with that layer rather than copied.
+	"""
+
+	def __init__(self):
+		self.layers = []
+		self.active = None
+		self.composite = TiledCanvas()
+		self._sigs = {}  # key -> what the composite tile was built from
+		self._next_id = 0
+
+	def __len__(self):
+		return len(self.layers)
+
+	def __iter__(self):
+		return iter(self.layers)
+
+	def add(self, name=None, index=None, id=None, visible=True, opacity=1.0):
+		if id is None:
+			id = self._next_id
+		self._next_id = max(self._next_id, id + 1)
+		layer = Layer(id, name or f"Layer {id + 1}", visible, opacity)
+		self.layers.insert(len(self.layers) if index is None else index, layer)
+		if self.active is None:
+			self.active = layer
+		return layer
+
+	def get(self, id):
+		for layer in self.layers:
+			if layer.id == id:
+				return layer
+		return None
+
+	def move(self, layer, index):
+		self.layers.remove(layer)
+		self.layers.insert(max(0, min(index, len(self.layers))), layer)
+
+	def clear(self):
+		self.layers = []
+		self.active = None
+		self.composite.clear()
+		self._sigs.clear()
+		self._next_id = 0
+
+	def tiles(self):
+		"""Every layer tile as ``(layer id, key) -> QImage``."""
+		return {(l.id, key): img for l in self.layers for key, img in l.canvas.tiles.items()}
+
+	def structure(self):
+		return [(l.id, l.name, l.visible, l.opacity) for l in self.layers]
+
+	def copy_structure(self):
+		stack = LayerStack()
+		for id, name, visible, opacity in self.structure():
+			stack.add(name, id=id, visible=visible, opacity=opacity)
+		stack.active = stack.get(self.active.id) if self.active is not None else None
+		return stack
+
+	def refresh(self, keys):
+		for key in keys:
+			sig = tuple(
+				(l.id, l.canvas.versions.get(key, 0), l.opacity)
+				for l in self.layers
+				if l.visible and l.opacity > 0 and key in l.canvas.tiles
+			)
+			if self._sigs.get(key, ()) == sig:
+				continue
+			if not sig:
+				del self._sigs[key]
+				self.composite.set_tile(key, None)
+				continue
+			self._sigs[key] = sig
+			if len(sig) == 1 and sig[0][2] >= 1.0:
+				self.composite.set_tile(key, QImage(self.get(sig[0][0]).canvas.tiles[key]))
+				continue
+			img = QImage(TILE_SIZE, TILE_SIZE, QImage.Format_ARGB32_Premultiplied)
+			img.fill(Qt.transparent)
+			p = QPainter(img)
+			for id, _, opacity in sig:
+				p.setOpacity(opacity)
+				p.drawImage(QPoint(), self.get(id).canvas.tiles[key])
+			p.end()
+			self.composite.set_tile(key, img)
+
+
+class LayersMixin:
+	"""Layers and the panel in the top right corner that lists them.
+
+	Strokes, erasers and clear act on the active layer only, and not at all
+	while it is hidden. In the panel,
+	the dot toggles visibility, a click selects, the wheel changes opacity
+	and the last row adds a layer. Alt+Up/Down moves the active layer.
+	"""
+	ROW_H = 28
+	PANEL_W = 180
+
+	def __init__(self):
+		super().__init__()
+		self.layers = LayerStack()
+		self.layers.add()
+		self.layers_rect = QRectF()
+
+	@property
+	def canvas(self):
+		return self.layers.active.canvas
+
+	def add_layer(self):
+		layer = self.layers.add(index=self.layers.layers.index(self.layers.active) + 1)
+		self.layers.active = layer
+		self._layers_changed()
+
+	def select_layer(self, layer):
+		self.layers.active = layer
+		self._layers_changed()
+
+	def move_layer(self, step):
+		layer = self.layers.active
+		self.layers.move(layer, self.layers.layers.index(layer) + step)
+		self._layers_changed()
+
+	def toggle_layer(self, layer):
+		layer.visible = not layer.visible
+		self._layers_changed()
+
+	def set_layer_opacity(self, layer, opacity):
+		layer.opacity = min(max(opacity, 0.0), 1.0)
+		self._layers_changed()
+
+	def _layers_above_preview(self):
+		# Visible layers over the active one while a stroke or shape is
+		# previewed on it
+		if self._live_poly is None and self._shape is None:
+			return []
+		stack = self.layers.layers
+		above = stack[stack.index(self.layers.active) + 1:]
+		return above if any(l.visible and l.opacity > 0 for l in above) else []
+
+	def _layers_changed(self):
+		self._layout_layers()
+		self.layers_dirty = True
+		self.schedule_autosave()
+		self.update()
+
+	def _layer_rows(self):
+		# Top layer first, then the "add" row
+		r = self.layers_rect
+		rows = []
+		for i, layer in enumerate(reversed(self.layers.layers)):
+			rows.append((layer, QRectF(r.left(), r.top() + 6 + i * self.ROW_H, r.width(), self.ROW_H)))
+		return rows
+
+	def _layers_state(self):
+		return (
+			self.layers_rect.width(), self.layers_rect.height(), self.devicePixelRatioF(),
+			self.layers.active.id,
+			tuple((layer.id, layer.name, layer.visible, layer.opacity) for layer in self.layers),
+		)
+
+	def _layout_layers(self):
+		h = (len(self.layers) + 1) * self.ROW_H + 12
+		self.layers_rect = QRectF(self.width() - self.PANEL_W - 16, 16, self.PANEL_W, h)
+
+	def _layer_at(self, pos):
+		for layer, row in self._layer_rows():
+			if row.contains(pos):
+				return layer, row
+		return None, None
+
+	def _layers_press(self, pos):
+		layer, row = self._layer_at(pos)
+		if layer is None:
+			if pos.y() > self.layers_rect.bottom() - self.ROW_H - 6:
+				self.add_layer()
+			return
+		if pos.x() < row.left() + 30:
+			self.toggle_layer(layer)
+		else:
+			self.select_layer(layer)
+
+	def _layers_wheel(self, pos, delta):
+		layer, _ = self._layer_at(pos)
+		if layer is not None:
+			self.set_layer_opacity(layer, round(layer.opacity * 10 + (1 if delta > 0 else -1)) / 10)
+
+	def _paint_layers(self, p):
+		# Into the cached overlay, see OverlayMixin
+		r = self.layers_rect
+		p.save()
+		p.setRenderHint(QPainter.Antialiasing, True)
+		p.setPen(Qt.NoPen)
+		p.setBrush(QColor(40, 44, 52, 220))
+		p.drawRoundedRect(r, 12, 12)
+		for layer, row in self._layer_rows():
+			if layer is self.layers.active:
+				p.setPen(Qt.NoPen)
+				p.setBrush(QColor(90, 95, 110, 240))
+				p.drawRoundedRect(row.adjusted(6, 2, -6, -2), 6, 6)
+			p.setPen(QColor(230, 230, 230) if layer.visible else QColor(120, 124, 136))
+			p.setBrush(QColor(230, 230, 230) if layer.visible else Qt.NoBrush)
+			p.drawEllipse(row.left() + 14, row.center().y() - 4, 8, 8)
+			text = row.adjusted(30, 0, -12, 0)
+			p.drawText(text, Qt.AlignVCenter | Qt.AlignLeft, layer.name)
+			p.drawText(text, Qt.AlignVCenter | Qt.AlignRight, f"{round(layer.opacity * 100)}%")
+		add = QRectF(r.left(), r.bottom() - self.ROW_H - 6, r.width(), self.ROW_H)
+		p.setPen(QColor(160, 164, 176))
+		p.drawText(add.adjusted(30, 0, 0, 0), Qt.AlignVCenter | Qt.AlignLeft, "+ New layer")
+		p.restore()
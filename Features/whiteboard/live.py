@@ -0,0 +1,112 @@
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QPainter, QPolygonF
+
+from .canvas import tile_rect
+from .strokes import poly_points
+from .smoothing import process
+
+
+class LiveStrokeMixin:
+	"""Frame-paced input for the stroke being drawn.
+
+	Pointer samples are only queued as they arrive and are flushed once per
+	display frame. A pen stroke in progress is painted over the tiles as a
+	single polyline and rasterized into the canvas in one pass on release;
+	the eraser has to change pixels as it goes, so each flush erases all
+	queued samples with one painter per tile.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self._queued = []
+		self._live_poly = None
+		self._frame_timer = None
+		self._erased = []
+
+	def _queue_point(self, pos):
+		self._queued.append(pos)
+		if self._frame_timer is None:
+			# Created on first use: the widget is not constructed yet in __init__
+			self._frame_timer = QTimer(self)
+			self._frame_timer.setTimerType(Qt.PreciseTimer)
+			self._frame_timer.timeout.connect(self._flush_points)
+		if not self._frame_timer.isActive():
+			rate = self.screen().refreshRate() if self.screen() else 60.0
+			self._frame_timer.start(max(1, int(1000 / max(rate, 1.0))))
+
+	def _flush_points(self):
+		pts, self._queued = self._queued, []
+		if not pts:
+			self._frame_timer.stop()
+			return
+
+		stroke = self._stroke
+		seg = pts if not len(stroke) else [self.last_pos] + pts
+		for pt in pts:
+			stroke.add_point(pt.x(), pt.y())
+		self.last_pos = pts[-1]
+
+		poly = QPolygonF(seg)
+		pad = stroke.width / 2 + 2
+		rect = poly.boundingRect().adjusted(-pad, -pad, pad, pad).toAlignedRect()
+
+		if stroke.tool == "stroke_eraser":
+			for key in self._erase_strokes(poly_points(seg), stroke.width / 2):
+				self.update(self.view_rect(tile_rect(key)))
+			return
+
+		if stroke.tool == "eraser":
+			self._touch_tiles(rect)
+			pen = stroke.pen()
+
+			def draw(p):
+				p.setCompositionMode(QPainter.CompositionMode_Clear)
+				p.setPen(pen)
+				if poly.size() == 1:
+					p.drawLine(poly.at(0), poly.at(0))
+				else:
+					p.drawPolyline(poly)
+
+			# Erasing never needs to allocate a tile that holds nothing
+			self.canvas.paint(rect, draw, create=False)
+		else:
+			if self._live_poly is None:
+				self._live_poly = QPolygonF()
+			for pt in pts:
+				self._live_poly.append(pt)
+
+		self.update(self.view_rect(rect))
+
+	def _commit_stroke(self):
+		self._flush_points()
+		stroke, self._stroke = self._stroke, None
+		if stroke.tool == "stroke_eraser":
+			erased, self._erased = self._erased, []
+			self._push_history(removed=erased)
+			return
+		flt = self.stroke_filters.get(stroke.tool)
+		if flt is not None:
+			# Tolerances are in screen pixels, so they follow the zoom
+			stroke.set_points(process(stroke.points, flt, 1 / self.zoom))
+		# The eraser has already painted its way along
+		drawn = stroke.tool != "eraser"
+		self._add_stroke(stroke, draw=drawn)
+		if drawn:
+			self.update(self.view_rect(stroke.bounds().toAlignedRect()))
+		self._live_poly = None
+
+	def _paint_live_stroke(self, p):
+		poly = self._live_poly
+		if poly is None or self._stroke is None:
+			return
+		p.save()
+		p.setRenderHint(QPainter.Antialiasing, True)
+		p.translate(-self.pan.x(), -self.pan.y())
+		p.scale(self.zoom, self.zoom)
+		p.setOpacity(self.layers.active.opacity)
+		p.setPen(self._stroke.pen())
+		if poly.size() == 1:
+			p.drawLine(poly.at(0), poly.at(0))
+		else:
+			p.drawPolyline(poly)
+		p.restore()
@@ -0,0 +1,69 @@
+from PySide6.QtCore import Qt, QRect
+from PySide6.QtGui import QPainter, QPixmap
+
+
+class OverlayMixin:
+	"""Chrome drawn over the canvas, each part cached in a pixmap of its own.
+
+	A part is only redrawn when its cache key changes; moving it, as on a
+	resize, just blits the same pixmap somewhere else.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self.overlay_rects = {}  # part -> QRect it covers
+		self._overlays = {}  # part -> (cache key, pixmap)
+
+	def _layout_chrome(self):
+		# Hit-testing geometry lives here, not in the paint path
+		self._compute_toolbar_rect()
+		self._compute_slider_rect()
+		self._layout_layers()
+
+	def invalidate_overlay(self):
+		self._overlays = {}
+
+	def _chrome_state(self):
+		return (
+			self.toolbar_rect.width(), self.toolbar_rect.height(), self.devicePixelRatioF(),
+			self.active_tool, self.pen_width, self.fill_tolerance, self.pen_color.rgba(), self.slider_visible,
+		)
+
+	def _overlay_parts(self):
+		# (part, rect, cache key, paint)
+		r = self.toolbar_rect
+		if self.slider_visible:
+			r = r.united(self.slider_rect)
+		return (
+			("chrome", r, self._chrome_state(), self._paint_chrome),
+			("layers", self.layers_rect, self._layers_state(), self._paint_layers),
+		)
+
+	def _paint_chrome(self, p):
+		self._paint_toolbar(p)
+		if self.slider_visible:
+			self._paint_slider(p)
+
+	def _ensure_overlay(self):
+		dpr = self.devicePixelRatioF()
+		for part, rect, state, paint in self._overlay_parts():
+			r = rect.toAlignedRect().adjusted(-1, -1, 1, 1)
+			self.overlay_rects[part] = r
+			cached = self._overlays.get(part)
+			if cached is not None and cached[0] == state:
+				continue
+
+			pix = QPixmap(r.size() * dpr)
+			pix.setDevicePixelRatio(dpr)
+			pix.fill(Qt.transparent)
+			p = QPainter(pix)
+			p.translate(-r.topLeft())
+			paint(p)
+			p.end()
+			self._overlays[part] = (state, pix)
+
+	def _paint_overlay(self, p, dirty):
+		self._ensure_overlay()
+		for part, r in self.overlay_rects.items():
+			if r.intersects(dirty):
+				p.drawPixmap(r.topLeft(), self._overlays[part][1])
@@ -0,0 +1,53 @@
+from array import array
+
+from PySide6.QtGui import QPainter
+
+from .strokes import Stroke
+
+
+class ShapesMixin:
+	"""Line, rectangle, ellipse and arrow tools.
+
+	While dragging, the shape is painted over the tiles like the live pen
+	stroke and only the area it covered before and after the move is
+	repainted; the canvas is left alone until release, when the shape is
+	rasterized once and logged as a two-point stroke.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self._shape = None
+
+	def _begin_shape(self, pos):
+		self._shape = Stroke(
+			self.active_tool, self.pen_color, self.pen_width,
+			array("f", (pos.x(), pos.y(), pos.x(), pos.y())), layer=self.layers.active.id,
+		)
+
+	def _drag_shape(self, pos):
+		shape = self._shape
+		before = self.view_rect(shape.bounds().toAlignedRect())
+		x0, y0 = shape.points[0], shape.points[1]
+		shape.set_points(array("f", (x0, y0, pos.x(), pos.y())))
+		self.update(before.united(self.view_rect(shape.bounds().toAlignedRect())))
+
+	def _commit_shape(self):
+		shape, self._shape = self._shape, None
+		x0, y0, x1, y1 = shape.points
+		rect = self.view_rect(shape.bounds().toAlignedRect())
+		if (x0, y0) == (x1, y1):
+			self.update(rect)
+			return
+		self._add_stroke(shape)
+		self.update(rect)
+
+	def _paint_shape(self, p):
+		if self._shape is None:
+			return
+		p.save()
+		p.setRenderHint(QPainter.Antialiasing, True)
+		p.translate(-self.pan.x(), -self.pan.y())
+		p.scale(self.zoom, self.zoom)
+		p.setOpacity(self.layers.active.opacity)
+		self._shape.render(p)
+		p.restore()
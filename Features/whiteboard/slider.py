@@ -1,6 +1,8 @@
 from PySide6.QtCore import QRectF, QPointF, Qt
 from PySide6.QtGui import QColor, QPainter
 
+from .fill import MAX_TOLERANCE
+
 class SliderMixin:
 	def __init__(self):
 		super().__init__()
@@ -8,6 +10,12 @@ class SliderMixin:
 		self.max_w = 30
 		self.pen_width = 5  # default pen size
 
+	def _slider_setting(self):
+		# (attribute, min, max) the slider sets for the active tool
+		if self.active_tool == "fill":
+			return "fill_tolerance", 0, MAX_TOLERANCE
+		return "pen_width", self.min_w, self.max_w
+
 	def _compute_slider_rect(self):
 		w = 260.0
 		h = 40.0
@@ -42,13 +50,21 @@ class SliderMixin:
 		p.drawRoundedRect(track, 3, 3)
 
 		# Handle position
-		tpos = track.left() + track.width() * ((self.pen_width - self.min_w) / (self.max_w - self.min_w))
+		attr, lo, hi = self._slider_setting()
+		value = getattr(self, attr)
+		tpos = track.left() + track.width() * ((value - lo) / (hi - lo))
 		handle = QRectF(tpos - 8, track.center().y() - 10, 16, 20)
 		p.setBrush(QColor(230, 230, 230))
 		p.drawRoundedRect(handle, 5, 5)
 
 		# Preview circle (current size, fixed position)
 		preview_center = QPointF(r.right() - max_preview_radius - preview_padding, r.center().y())
+		if attr == "fill_tolerance":
+			p.setPen(QColor("#e6e6e6"))
+			box = QRectF(0, 0, preview_space, r.height())
+			box.moveCenter(preview_center)
+			p.drawText(box, Qt.AlignCenter, str(value))
+			return
 		p.setBrush(QColor("#e6e6e6"))
 		p.drawEllipse(preview_center, self.pen_width / 2, self.pen_width / 2)
 
@@ -67,5 +83,6 @@ class SliderMixin:
 
 		x = max(track.left(), min(x, track.right()-4))
 		t = (x - track.left()) / max(1.0, track.width())
-		self.pen_width = int(self.min_w + t * (self.max_w - self.min_w))
-		self.update()
+		attr, lo, hi = self._slider_setting()
+		setattr(self, attr, int(lo + t * (hi - lo)))
+		self.update(self.slider_rect.toAlignedRect())
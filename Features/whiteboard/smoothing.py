@@ -0,0 +1,107 @@
+from array import array
+
+import numpy as np
+
+
+class StrokeFilter:
+	"""Post-processing applied to a stroke's points when it is committed.
+
+	``tolerance`` is the Ramer-Douglas-Peucker distance in screen pixels (0
+	keeps every sample). ``smoothing`` is ``None``, ``"chaikin"`` or
+	``"catmull-rom"`` and runs after simplification.
+	"""
+	__slots__ = ("tolerance", "smoothing", "iterations")
+
+	def __init__(self, tolerance=0.0, smoothing=None, iterations=2):
+		self.tolerance = tolerance
+		self.smoothing = smoothing
+		self.iterations = iterations
+
+
+def simplify(pts, tolerance):
+	"""Ramer-Douglas-Peucker over an (N, 2) array, returning the kept rows.
+
+	Instead of recursing one span at a time, every open span is split in
+	the same pass, so the number of NumPy calls grows with the depth of the
+	recursion rather than with the number of kept points.
+	"""
+	n = len(pts)
+	if n < 3 or tolerance <= 0:
+		return pts
+	x = pts[:, 0].astype(np.float64)
+	y = pts[:, 1].astype(np.float64)
+	keep = np.zeros(n, dtype=bool)
+	keep[0] = keep[-1] = True
+	tol2 = tolerance * tolerance
+	while True:
+		kept = np.flatnonzero(keep)
+		span = np.cumsum(keep) - 1  # span each point belongs to
+		span[-1] = len(kept) - 2
+		a = kept[span]
+		b = kept[span + 1]
+		sx = x[b] - x[a]
+		sy = y[b] - y[a]
+		rx = x - x[a]
+		ry = y - y[a]
+		seg_len2 = sx * sx + sy * sy
+		cross = rx * sy - ry * sx
+		# Distance to the chord, or to its start when the chord is a point
+		d2 = np.divide(cross * cross, seg_len2, out=rx * rx + ry * ry, where=seg_len2 > 0)
+		d2[keep] = 0.0
+
+		# Farthest point of every span, kept only where it is out of tolerance
+		worst = np.maximum.reduceat(d2, kept[:-1])
+		split = worst > tol2
+		if not split.any():
+			return pts[keep]
+		hit = np.flatnonzero((d2 == worst[span]) & split[span])
+		first = np.ones(len(hit), dtype=bool)
+		first[1:] = span[hit[1:]] != span[hit[:-1]]
+		keep[hit[first]] = True
+
+
+def chaikin(pts, iterations=2):
+	"""Corner cutting; each pass doubles the points and keeps both ends."""
+	for _ in range(iterations):
+		if len(pts) < 3:
+			break
+		q = pts[:-1] * 0.75 + pts[1:] * 0.25
+		r = pts[:-1] * 0.25 + pts[1:] * 0.75
+		cut = np.empty((2 * len(q), 2), dtype=pts.dtype)
+		cut[0::2] = q
+		cut[1::2] = r
+		pts = np.vstack((pts[:1], cut[1:-1], pts[-1:]))
+	return pts
+
+
+def catmull_rom(pts, samples=4):
+	"""Uniform Catmull-Rom spline through every point, ``samples`` per span."""
+	if len(pts) < 3:
+		return pts
+	ext = np.vstack((pts[:1], pts, pts[-1:]))
+	p0, p1, p2, p3 = ext[:-3], ext[1:-2], ext[2:-1], ext[3:]
+	t = np.linspace(0.0, 1.0, samples, endpoint=False, dtype=pts.dtype)[None, :, None]
+	t2 = t * t
+	t3 = t2 * t
+	curve = 0.5 * (
+		2 * p1[:, None]
+		+ (p2 - p0)[:, None] * t
+		+ (2 * p0 - 5 * p1 + 4 * p2 - p3)[:, None] * t2
+		+ (3 * p1 - p0 - 3 * p2 + p3)[:, None] * t3
+	)
+	return np.vstack((curve.reshape(-1, 2), pts[-1:]))
+
+
+def process(points, flt, scale=1.0):
+	"""Apply ``flt`` to flat ``array('f')`` points; ``scale`` maps pixels to world units."""
+	if len(points) < 6:
+		return points
+	pts = np.frombuffer(points, dtype=np.float32).reshape(-1, 2)
+	pts = simplify(pts, flt.tolerance * scale)
+	if flt.smoothing == "chaikin":
+		pts = chaikin(pts, flt.iterations)
+	elif flt.smoothing == "catmull-rom":
+		pts = catmull_rom(pts, 1 << flt.iterations)
+	out = array("f")
+	out.frombytes(np.ascontiguousarray(pts, dtype=np.float32).tobytes())
+	return out
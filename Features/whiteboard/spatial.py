@@ -0,0 +1,132 @@
+from collections import defaultdict
+
+import numpy as np
+
+CELL_SIZE = 64
+
+
+def _segments(points, runs=False):
+	pts = np.frombuffer(points, dtype=np.float32).reshape(-1, 2).astype(np.float64)
+	if runs:
+		# Fill runs are separate segments, not one polyline
+		return pts[0::2], pts[1::2]
+	if len(pts) == 1:
+		pts = np.vstack((pts, pts))
+	return pts[:-1], pts[1:]
+
+
+def _point_seg_dist2(p, a, b):
+	# p: (..., 2) points against segments a-b broadcast to the same shape
+	ab = b - a
+	len2 = np.einsum("...i,...i->...", ab, ab)
+	t = np.einsum("...i,...i->...", p - a, ab) / np.where(len2 > 0, len2, 1.0)
+	t = np.clip(np.where(len2 > 0, t, 0.0), 0.0, 1.0)
+	d = p - (a + t[..., None] * ab)
+	return np.einsum("...i,...i->...", d, d)
+
+
+def segments_dist2(a0, a1, b0, b1):
+	"""Smallest squared distance between any segment of A and any of B."""
+	a0, a1 = a0[:, None], a1[:, None]
+	b0, b1 = b0[None, :], b1[None, :]
+	d = np.minimum.reduce([
+		_point_seg_dist2(a0, b0, b1), _point_seg_dist2(a1, b0, b1),
+		_point_seg_dist2(b0, a0, a1), _point_seg_dist2(b1, a0, a1),
+	])
+
+	def orient(p, q, r):
+		return (q[..., 0] - p[..., 0]) * (r[..., 1] - p[..., 1]) - (q[..., 1] - p[..., 1]) * (r[..., 0] - p[..., 0])
+
+	crossing = (
+		(orient(a0, a1, b0) * orient(a0, a1, b1) < 0)
+		& (orient(b0, b1, a0) * orient(b0, b1, a1) < 0)
+	)
+	return float(np.where(crossing, 0.0, d).min())
+
+
+def _inside(corners, xs, ys):
+	"""Whether any of the points ``xs, ys`` lies in the rect between two corners."""
+	x0, y0, x1, y1 = corners
+	return any(
+		min(x0, x1) <= x <= max(x0, x1) and min(y0, y1) <= y <= max(y0, y1)
+		for x, y in zip(xs, ys)
+	)
+
+
+class StrokeIndex:
+	"""Uniform grid over stroke segments for hit-testing whole strokes.
+
+	Each CELL_SIZE cell lists the strokes whose segments (padded by half
+	their width) pass through it, so a query only looks at the strokes near
+	the eraser instead of every stroke on the board.
+	"""
+
+	def __init__(self):
+		self.cells = defaultdict(set)  # (cx, cy) -> {seq}
+		self.strokes = {}  # seq -> Stroke
+		self._cells_of = {}  # seq -> cells the stroke was filed under
+
+	def __len__(self):
+		return len(self.strokes)
+
+	def add(self, stroke):
+		cells = stroke.tiles(0, CELL_SIZE)
+		self.strokes[stroke.seq] = stroke
+		self._cells_of[stroke.seq] = cells
+		for cell in cells:
+			self.cells[cell].add(stroke.seq)
+
+	def remove(self, stroke):
+		self.strokes.pop(stroke.seq, None)
+		for cell in self._cells_of.pop(stroke.seq, ()):
+			bucket = self.cells.get(cell)
+			if bucket is not None:
+				bucket.discard(stroke.seq)
+				if not bucket:
+					del self.cells[cell]
+
+	def clear(self):
+		self.cells.clear()
+		self.strokes.clear()
+		self._cells_of.clear()
+
+	def _candidates(self, left, top, right, bottom):
+		seqs = set()
+		for cx in range(int(left // CELL_SIZE), int(right // CELL_SIZE) + 1):
+			for cy in range(int(top // CELL_SIZE), int(bottom // CELL_SIZE) + 1):
+				seqs.update(self.cells.get((cx, cy), ()))
+		return seqs
+
+	def in_rect(self, rect):
+		"""Strokes whose bounds meet ``rect``, in drawing order."""
+		seqs = self._candidates(rect.left(), rect.top(), rect.right(), rect.bottom())
+		found = [self.strokes[s] for s in seqs if self.strokes[s].bounds().intersects(rect)]
+		found.sort(key=lambda s: s.seq)
+		return found
+
+	def hit(self, points, radius):
+		"""Strokes passing within ``radius`` of the polyline ``points``."""
+		xs = points[0::2]
+		ys = points[1::2]
+		seqs = self._candidates(min(xs) - radius, min(ys) - radius, max(xs) + radius, max(ys) + radius)
+		if not seqs:
+			return []
+		q0, q1 = _segments(points)
+		hits = []
+		for seq in sorted(seqs):
+			stroke = self.strokes[seq]
+			reach = radius + stroke.width / 2
+			s0, s1 = _segments(stroke.outline(), stroke.tool == "fill")
+			# Only the segments whose boxes come near the query are measured
+			lo = np.minimum(s0, s1)
+			hi = np.maximum(s0, s1)
+			near = (
+				(hi[:, 0] >= min(xs) - reach) & (lo[:, 0] <= max(xs) + reach)
+				& (hi[:, 1] >= min(ys) - reach) & (lo[:, 1] <= max(ys) + reach)
+			)
+			if near.any() and segments_dist2(s0[near], s1[near], q0, q1) <= reach * reach:
+				hits.append(stroke)
+			elif stroke.tool == "image" and _inside(stroke.points, xs, ys):
+				hits.append(stroke)  # a picture is solid, not just its frame
+		return hits
+
@@ -0,0 +1,207 @@
+import bisect
+import itertools
+import math
+from array import array
+
+import numpy as np
+from PySide6.QtCore import Qt, QPointF, QRectF
+from PySide6.QtGui import QColor, QImage, QPainter, QPen, QPolygonF
+
+from .canvas import TILE_SIZE, tile_rect, tiles_along, tiles_along_runs
+
+_next_seq = itertools.count()
+
+SHAPES = ("line", "rect", "ellipse", "arrow")
+ARROW_ANGLE = math.radians(25)
+
+
+class Stroke:
+	"""One pen or eraser stroke kept as geometry rather than pixels.
+
+	Points are stored flat as ``x0, y0, x1, y1, ...`` in an ``array('f')``,
+	so a stroke costs 8 bytes per sample. ``seq`` orders strokes on the board
+	and is used to put removed strokes back where they were; ``layer`` is the
+	id of the layer the stroke was drawn on. A shape (one of SHAPES) keeps
+	only the two corners it was dragged between. A ``"fill"`` stroke is not a
+	line: its points come in pairs ``x0, y, x1, y`` marking the filled pixel
+	runs ``[x0, x1)`` of row ``y``, sorted by row.
+	"""
+	__slots__ = ("seq", "tool", "color", "width", "points", "layer", "_bounds")
+
+	def __init__(self, tool, color, width, points=None, layer=0):
+		self.seq = next(_next_seq)
+		self.tool = tool
+		self.layer = layer
+		self.color = color.rgba() if isinstance(color, QColor) else color
+		self.width = float(width)
+		self.points = points if points is not None else array("f")
+		self._bounds = None
+
+	def __len__(self):
+		return len(self.points) // 2
+
+	def add_point(self, x, y):
+		self.points.append(x)
+		self.points.append(y)
+		self._bounds = None
+
+	def set_points(self, points):
+		self.points = points
+		self._bounds = None
+
+	def outline(self):
+		"""The stroke as a polyline of flat ``x, y`` pairs."""
+		if self.tool not in SHAPES:
+			return self.points
+		x0, y0, x1, y1 = self.points
+		if self.tool == "rect":
+			return array("f", (x0, y0, x1, y0, x1, y1, x0, y1, x0, y0))
+		if self.tool == "ellipse":
+			cx, cy, rx, ry = (x0 + x1) / 2, (y0 + y1) / 2, abs(x1 - x0) / 2, abs(y1 - y0) / 2
+			n = min(max(int(math.pi * (rx + ry) / 4), 16), 256)
+			out = array("f")
+			for i in range(n + 1):
+				a = 2 * math.pi * i / n
+				out.extend((cx + rx * math.cos(a), cy + ry * math.sin(a)))
+			return out
+		if self.tool == "arrow" and (x0, y0) != (x1, y1):
+			# Tail to tip, then each side of the head and back to the tip
+			head = max(12.0, 3 * self.width)
+			a = math.atan2(y1 - y0, x1 - x0)
+			lx, ly = x1 - head * math.cos(a - ARROW_ANGLE), y1 - head * math.sin(a - ARROW_ANGLE)
+			rx, ry = x1 - head * math.cos(a + ARROW_ANGLE), y1 - head * math.sin(a + ARROW_ANGLE)
+			return array("f", (x0, y0, x1, y1, lx, ly, x1, y1, rx, ry))
+		return self.points
+
+	def bounds(self):
+		if self._bounds is None:
+			pts = self.outline()
+			xs = pts[0::2]
+			ys = pts[1::2]
+			pad = self.width / 2 + 1
+			self._bounds = QRectF(
+				min(xs) - pad, min(ys) - pad,
+				max(xs) - min(xs) + 2 * pad, max(ys) - min(ys) + 2 * pad,
+			)
+		return self._bounds
+
+	def tiles(self, pad, size=TILE_SIZE):
+		"""Keys of the ``size`` cells the stroke's ink, widened by ``pad``, touches."""
+		if self.tool == "fill":
+			return tiles_along_runs(self.points, pad, size)
+		return tiles_along(self.outline(), self.width / 2 + pad, size)
+
+	def pen(self):
+		color = Qt.transparent if self.tool == "eraser" else QColor.fromRgba(self.color)
+		return QPen(color, self.width, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+
+	def render(self, p):
+		if self.tool == "fill":
+			p.setCompositionMode(QPainter.CompositionMode_SourceOver)
+			render_spans(p, self.points, self.color)
+			return
+		p.setCompositionMode(
+			QPainter.CompositionMode_Clear if self.tool == "eraser"
+			else QPainter.CompositionMode_SourceOver
+		)
+		p.setPen(self.pen())
+		if self.tool == "ellipse":
+			p.setBrush(Qt.NoBrush)
+			x0, y0, x1, y1 = self.points
+			p.drawEllipse(QRectF(QPointF(x0, y0), QPointF(x1, y1)).normalized())
+			return
+		pts = self.outline()
+		if len(pts) == 2:
+			pt = QPointF(pts[0], pts[1])
+			p.drawLine(pt, pt)
+		else:
+			p.drawPolyline(QPolygonF([QPointF(pts[i], pts[i + 1]) for i in range(0, len(pts), 2)]))
+
+
+def render_spans(p, points, color):
+	"""Draw fill runs as one image covering only what the painter can reach.
+
+	On a tile painter that is a tile's worth of rows, so committing a large
+	fill costs about the same per tile as a pen stroke.
+	"""
+	runs = np.frombuffer(points, dtype=np.float32).reshape(-1, 4)
+	device = p.device()
+	inv, _ = p.worldTransform().inverted()
+	reach = inv.mapRect(QRectF(0, 0, device.width(), device.height()))
+	ys = runs[:, 1]
+	top = max(math.floor(reach.top()), int(ys[0]))
+	bottom = min(math.ceil(reach.bottom()), int(ys[-1]) + 1)
+	if top >= bottom:
+		return
+	# Runs are in row order, so only the rows in reach are converted
+	spans = runs[np.searchsorted(ys, top):np.searchsorted(ys, bottom)].astype(np.int64)
+	if not len(spans):
+		return
+	left = max(math.floor(reach.left()), int(spans[:, 0].min()))
+	right = min(math.ceil(reach.right()), int(spans[:, 2].max()))
+	if left >= right:
+		return
+	x0 = np.clip(spans[:, 0], left, right) - left
+	x1 = np.clip(spans[:, 2], left, right) - left
+	keep = x1 > x0
+	rows = spans[keep, 1] - top
+	w = right - left
+	# +1 where a run starts and -1 past its end; the running sum is then
+	# positive exactly on filled pixels
+	n = (bottom - top) * (w + 1)
+	starts = np.bincount(rows * (w + 1) + x0[keep], minlength=n)
+	ends = np.bincount(rows * (w + 1) + x1[keep], minlength=n)
+	edges = (starts - ends).reshape(bottom - top, w + 1)
+	pixels = np.where(np.cumsum(edges, axis=1)[:, :w] > 0, np.uint32(color), np.uint32(0))
+	img = QImage(pixels.data, w, bottom - top, 4 * w, QImage.Format_ARGB32)
+	p.drawImage(QPointF(left, top), img)
+
+
+def poly_points(pts):
+	"""Flat ``array('f')`` of ``x, y`` pairs from a list of QPointF."""
+	out = array("f")
+	for pt in pts:
+		out.append(pt.x())
+		out.append(pt.y())
+	return out
+
+
+def insert_stroke(strokes, stroke):
+	bisect.insort(strokes, stroke, key=lambda s: s.seq)
+
+
+def render_strokes(p, strokes, rect=None):
+	"""Replay ``strokes`` in order, skipping those outside ``rect``."""
+	p.setRenderHint(QPainter.Antialiasing, True)
+	for stroke in strokes:
+		if rect is None or stroke.bounds().intersects(rect):
+			stroke.render(p)
+
+
+def redraw_tiles(canvas, keys, strokes_in):
+	"""Rebuild tiles ``keys`` of ``canvas`` from ``strokes_in(rect)``, dropping empty ones."""
+	for key in keys:
+		rect = tile_rect(key)
+		strokes = strokes_in(QRectF(rect))
+		if not strokes:
+			canvas.set_tile(key, None)
+			continue
+		img = QImage(TILE_SIZE, TILE_SIZE, QImage.Format_ARGB32_Premultiplied)
+		img.fill(Qt.transparent)
+		p = QPainter(img)
+		p.translate(-rect.left(), -rect.top())
+		render_strokes(p, strokes)
+		p.end()
+		canvas.set_tile(key, img)
+
+
+def rasterize(strokes, size, scale=1.0, origin=QPointF()):
+	"""Render strokes into a new image of ``size`` at any zoom factor."""
+	img = QImage(size, QImage.Format_ARGB32_Premultiplied)
+	img.fill(Qt.transparent)
+	p = QPainter(img)
+	p.scale(scale, scale)
+	p.translate(-origin)
+	render_strokes(p, strokes, QRectF(origin, QRectF(img.rect()).size() / scale))
+	p.end()
+	return img
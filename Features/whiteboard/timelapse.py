@@ -0,0 +1,274 @@
+import bisect
+import time
+
+from PySide6.QtCore import Qt, QRectF, QTimer
+from PySide6.QtGui import QColor, QImage, QPainter
+
+from .strokes import redraw_tiles
+
+MAX_GAP_S = 0.5  # pauses longer than this are cut short on playback
+SPEEDS = (0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+
+
+class Checkpoint:
+	__slots__ = ("index", "tiles", "nbytes")
+
+	def __init__(self, index, tiles, nbytes):
+		self.index = index  # number of events applied
+		self.tiles = tiles  # (layer id, key) -> QImage sharing pixels with the board
+		self.nbytes = nbytes  # pixels this checkpoint keeps alive on its own
+
+
+class Timeline:
+	"""Every change to the stroke log over a session, plus raster checkpoints.
+
+	Unlike the undo stack nothing is ever dropped: an undo is recorded as one
+	more event. A checkpoint is taken once ``every`` events or ``every_s``
+	seconds have passed since the last; it holds shallow copies of the board
+	tiles, so it costs nothing until the board draws over them. When the
+	checkpoints keep more than ``budget`` bytes alive, every other one is
+	dropped, which at most doubles the replay needed for a seek.
+	"""
+
+	def __init__(self, every=64, every_s=20.0, budget=128 * 1024 * 1024):
+		self.every = every
+		self.every_s = every_s
+		self.budget = budget
+		self.reset([], None)
+
+	def reset(self, strokes, layers):
+		self.base = tuple(strokes)
+		self.events = []  # (seconds since start, removed, added)
+		self.checkpoints = []
+		self.nbytes = 0
+		self.start = time.monotonic()
+		self._last = self.start
+		self._keep(layers.tiles() if layers is not None else {})
+
+	def __len__(self):
+		return len(self.events)
+
+	def record(self, removed, added):
+		self.events.append((time.monotonic() - self.start, tuple(removed), tuple(added)))
+
+	def settle(self, layers):
+		"""Called once a change has reached the tiles of ``layers``."""
+		if len(self.events) - self.checkpoints[-1].index >= self.every or (
+			self.events and time.monotonic() - self._last >= self.every_s
+		):
+			self._keep(layers.tiles())
+
+	def _keep(self, tiles):
+		shared = {key: QImage(img) for key, img in tiles.items()}
+		seen = {img.cacheKey() for img in self.checkpoints[-1].tiles.values()} if self.checkpoints else set()
+		nbytes = sum(img.sizeInBytes() for img in shared.values() if img.cacheKey() not in seen)
+		self.checkpoints.append(Checkpoint(len(self.events), shared, nbytes))
+		self.nbytes += nbytes
+		self._last = time.monotonic()
+		while self.nbytes > self.budget and len(self.checkpoints) > 2:
+			# Thin out, always keeping the first and the newest
+			kept = self.checkpoints[:1] + self.checkpoints[2:-1:2] + self.checkpoints[-1:]
+			self.checkpoints = kept
+			self.nbytes = sum(c.nbytes for c in kept)
+
+	def checkpoint_before(self, index):
+		i = bisect.bisect_right(self.checkpoints, index, key=lambda c: c.index) - 1
+		return self.checkpoints[max(i, 0)]
+
+
+class TimelapsePlayer:
+	"""Rebuilds the board as it was after any number of timeline events.
+
+	Replay happens on layers of its own, shaped like the board's ``layers``.
+	"""
+
+	def __init__(self, timeline, layers):
+		self.timeline = timeline
+		self.events = list(timeline.events)
+		self.layers = layers.copy_structure()
+		self.position = 0
+		self.live = {}  # seq -> Stroke on the board at ``position``
+		self.speed = 1.0
+		self.clock = 0.0
+
+		# Playback time with long pauses squeezed out
+		self.times = []
+		t = prev = 0.0
+		for when, _, _ in self.events:
+			t += min(when - prev, MAX_GAP_S)
+			prev = when
+			self.times.append(t)
+		self.seek(0)
+
+	@property
+	def duration(self):
+		return self.times[-1] if self.times else 0.0
+
+	def seek(self, index):
+		index = max(0, min(index, len(self.events)))
+		cp = self.timeline.checkpoint_before(index)
+		if not (cp.index <= self.position <= index):
+			# Going back, or far enough ahead that the checkpoint is closer
+			for layer in self.layers:
+				layer.canvas.clear()
+			for (id, key), img in cp.tiles.items():
+				layer = self.layers.get(id)
+				if layer is not None:
+					layer.canvas.set_tile(key, QImage(img))
+			self.live = {s.seq: s for s in self.timeline.base}
+			for _, removed, added in self.events[:cp.index]:
+				for stroke in removed:
+					self.live.pop(stroke.seq, None)
+				for stroke in added:
+					self.live[stroke.seq] = stroke
+			self.position = cp.index
+		while self.position < index:
+			self._apply(self.events[self.position])
+			self.position += 1
+		self.clock = self.times[index - 1] if index else 0.0
+
+	def _apply(self, event):
+		_, removed, added = event
+		top = max(self.live, default=-1)
+		for stroke in removed:
+			self.live.pop(stroke.seq, None)
+		for stroke in added:
+			self.live[stroke.seq] = stroke
+		if not removed and all(s.seq > top for s in added):
+			for stroke in sorted(added, key=lambda s: s.seq):
+				layer = self.layers.get(stroke.layer)
+				if layer is not None:
+					keys = stroke.tiles(2)
+					layer.canvas.paint(stroke.bounds().toAlignedRect(), stroke.render, keys=keys)
+			return
+		if not self.live:
+			for layer in self.layers:
+				layer.canvas.clear()
+			return
+		keys = {}
+		for stroke in removed + added:
+			keys.setdefault(stroke.layer, set()).update(stroke.tiles(2))
+		for id, layer_keys in keys.items():
+			layer = self.layers.get(id)
+			if layer is None:
+				continue
+			order = sorted((s for s in self.live.values() if s.layer == id), key=lambda s: s.seq)
+			redraw_tiles(layer.canvas, layer_keys, lambda r: [s for s in order if s.bounds().intersects(r)])
+
+	def advance(self, seconds):
+		"""Play forward by ``seconds`` of wall time; False once at the end."""
+		self.clock += seconds * self.speed
+		self.seek(bisect.bisect_right(self.times, self.clock))
+		return self.position < len(self.events)
+
+
+class TimelapseMixin:
+	"""Replay of the session on top of the board.
+
+	Ctrl+T toggles replay. While it is on, the board shows the player's
+	layers; Space plays or pauses, Left/Right step, [ and ] change speed and
+	the bar at the top seeks. Drawing waits until replay is closed.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self.timeline = Timeline()
+		self.replay = None
+		self._replay_timer = None
+		self._replay_tick = 0.0
+		self.replay_rect = QRectF()
+		self.replay_seeking = False
+
+	@property
+	def shown_layers(self):
+		return self.replay.layers if self.replay is not None else self.layers
+
+	def toggle_replay(self):
+		if self.replay is not None:
+			self._replay_timer.stop()
+			self.replay = None
+		else:
+			self._finish_load()
+			self.replay = TimelapsePlayer(self.timeline, self.layers)
+			if self._replay_timer is None:
+				self._replay_timer = QTimer(self)
+				self._replay_timer.setTimerType(Qt.PreciseTimer)
+				self._replay_timer.timeout.connect(self._replay_step)
+			self.play_replay()
+		self.update()
+
+	def play_replay(self):
+		if self.replay is None:
+			return
+		if self._replay_timer.isActive():
+			self._replay_timer.stop()
+		else:
+			if self.replay.position >= len(self.replay.events):
+				self.replay.seek(0)
+			self._replay_tick = time.monotonic()
+			self._replay_timer.start(16)
+		self.update()
+
+	def step_replay(self, delta):
+		if self.replay is not None:
+			self.replay.seek(self.replay.position + delta)
+			self.update()
+
+	def replay_speed(self, step):
+		if self.replay is not None:
+			i = min(range(len(SPEEDS)), key=lambda n: abs(SPEEDS[n] - self.replay.speed))
+			self.replay.speed = SPEEDS[max(0, min(len(SPEEDS) - 1, i + step))]
+			self.update(self.replay_rect.toAlignedRect())
+
+	def _replay_step(self):
+		now = time.monotonic()
+		dt, self._replay_tick = now - self._replay_tick, now
+		if not self.replay.advance(dt):
+			self._replay_timer.stop()
+		self.update()
+
+	def _seek_replay_to(self, x):
+		track = self._replay_track()
+		frac = min(max((x - track.left()) / track.width(), 0.0), 1.0)
+		self.replay.seek(round(frac * len(self.replay.events)))
+		self.update()
+
+	def _layout_replay(self):
+		w = min(460.0, self.width() - 32.0)
+		self.replay_rect = QRectF((self.width() - w) / 2, 16, w, 36)
+
+	def _replay_track(self):
+		r = self.replay_rect
+		return QRectF(r.left() + 16, r.center().y() - 3, r.width() - 120, 6)
+
+	def _record_timeline(self, removed, added):
+		if not self.loading:
+			self.timeline.record(removed, added)
+
+	def _settle_timeline(self):
+		self.timeline.settle(self.layers)
+
+	def _paint_replay(self, p):
+		if self.replay is None:
+			return
+		self._layout_replay()
+		r = self.replay_rect
+		p.save()
+		p.setRenderHint(QPainter.Antialiasing, True)
+		p.setPen(Qt.NoPen)
+		p.setBrush(QColor(40, 44, 52, 220))
+		p.drawRoundedRect(r, 12, 12)
+
+		track = self._replay_track()
+		p.setBrush(QColor(90, 95, 110, 240))
+		p.drawRoundedRect(track, 3, 3)
+		total = len(self.replay.events)
+		frac = self.replay.position / total if total else 1.0
+		done = QRectF(track.left(), track.top(), track.width() * frac, track.height())
+		p.setBrush(QColor(230, 230, 230))
+		p.drawRoundedRect(done, 3, 3)
+
+		p.setPen(QColor(230, 230, 230))
+		label = QRectF(track.right() + 8, r.top(), r.right() - track.right() - 16, r.height())
+		p.drawText(label, Qt.AlignVCenter | Qt.AlignRight, f"{self.replay.position}/{total}  ×{self.replay.speed:g}")
+		p.restore()
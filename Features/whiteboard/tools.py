@@ -1,5 +1,6 @@
 from PySide6.QtWidgets import QColorDialog
-from PySide6.QtCore import Qt
+
+from .strokes import redraw_tiles
 
 class ToolsMixin:
 	def set_pen(self):
@@ -18,9 +19,56 @@ class ToolsMixin:
 			self.slider_visible = False
 		self.update()
 
+	def set_stroke_eraser(self):
+		if self.active_tool == "stroke_eraser":
+			self.slider_visible = not self.slider_visible
+		else:
+			self.active_tool = "stroke_eraser"
+			self.slider_visible = False
+		self.update()
+
+	def set_shape(self, name):
+		if self.active_tool == name:
+			self.slider_visible = not self.slider_visible
+		else:
+			self.active_tool = name
+			self.slider_visible = False
+		self.update()
+
+	def _erase_strokes(self, points, radius):
+		# Whole strokes under the eraser leave the log; only the tiles they
+		# covered are redrawn from what is left
+		# Pixel-eraser strokes are invisible; removing one would bring back ink
+		layer = self.layers.active.id
+		hits = [
+			s for s in self.stroke_index.hit(points, radius)
+			if s.tool != "eraser" and s.layer == layer
+		]
+		keys = set()
+		if not hits:
+			return keys
+		for stroke in hits:
+			keys |= stroke.tiles(2)
+		self._touch_keys(keys)
+		self._swap_strokes(hits, ())
+		self._rerender_tiles(keys)
+		self._erased.extend(hits)
+		return keys
+
+	def _rerender_tiles(self, keys, layer=None):
+		layer = layer or self.layers.active
+		redraw_tiles(
+			layer.canvas, keys,
+			lambda r: [s for s in self.stroke_index.in_rect(r) if s.layer == layer.id],
+		)
+
 	def clear_canvas(self):
-		self.canvas.fill(Qt.transparent)
-		self._push_history()
+		self._begin_history()
+		self._touch_keys(list(self.canvas.tiles))
+		self.canvas.clear()
+		removed = [s for s in self.strokes if s.layer == self.layers.active.id]
+		self._swap_strokes(removed, ())
+		self._push_history(removed=removed)
 		self.update()
 
 	def pick_color(self):
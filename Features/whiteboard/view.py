@@ -0,0 +1,99 @@
+import math
+
+from PySide6.QtCore import QPoint, QPointF, QRect, QSize, Qt
+from PySide6.QtGui import QPainter
+
+from .canvas import TileCache, tiles_in_rect, zoom_span
+
+ZOOM_LEVELS = (0.25, 0.35, 0.5, 0.7, 1.0, 1.4, 2.0, 2.8, 4.0)
+
+
+class ViewMixin:
+	def __init__(self):
+		super().__init__()
+		self.zoom = 1.0
+		self.pan = QPoint()  # widget origin in zoomed world pixels
+		self.panning = False
+		self._pan_anchor = QPoint()
+		self.tile_cache = TileCache()
+
+	def to_world(self, pos):
+		return QPointF((pos.x() + self.pan.x()) / self.zoom, (pos.y() + self.pan.y()) / self.zoom)
+
+	def world_rect(self, rect):
+		z = self.zoom
+		left = math.floor((rect.left() + self.pan.x()) / z)
+		top = math.floor((rect.top() + self.pan.y()) / z)
+		right = math.ceil((rect.right() + 1 + self.pan.x()) / z)
+		bottom = math.ceil((rect.bottom() + 1 + self.pan.y()) / z)
+		return QRect(left, top, right - left, bottom - top)
+
+	def view_rect(self, rect):
+		z = self.zoom
+		return QRect(
+			math.floor(rect.left() * z) - self.pan.x(),
+			math.floor(rect.top() * z) - self.pan.y(),
+			math.ceil(rect.width() * z) + 2,
+			math.ceil(rect.height() * z) + 2,
+		)
+
+	def zoom_at(self, pos, step):
+		i = min(range(len(ZOOM_LEVELS)), key=lambda n: abs(ZOOM_LEVELS[n] - self.zoom))
+		zoom = ZOOM_LEVELS[max(0, min(len(ZOOM_LEVELS) - 1, i + step))]
+		if zoom == self.zoom:
+			return
+		world = self.to_world(pos)
+		self.zoom = zoom
+		self.pan = QPoint(round(world.x() * zoom - pos.x()), round(world.y() * zoom - pos.y()))
+		self.update()
+
+	def pan_by(self, dx, dy):
+		self.pan -= QPoint(round(dx), round(dy))
+		self.update()
+
+	def reset_view(self):
+		self.zoom = 1.0
+		self.pan = QPoint()
+		self.update()
+
+	def _paint_tiles(self, p, rect):
+		# Only the composite tiles about to be drawn are brought up to date
+		keys = tiles_in_rect(self.world_rect(rect))
+		layers = self.shown_layers
+		layers.refresh(keys)
+		self._paint_canvas(p, rect, layers.composite, keys)
+
+	def _paint_layer_tiles(self, p, rect, layers):
+		# Layer by layer, for when something has to go in between them
+		keys = tiles_in_rect(self.world_rect(rect))
+		for layer in layers:
+			if layer.visible and layer.opacity > 0:
+				p.setOpacity(layer.opacity)
+				self._paint_canvas(p, rect, layer.canvas, keys, cached=False)
+		p.setOpacity(1.0)
+
+	def _paint_canvas(self, p, rect, canvas, keys, cached=True):
+		for key in keys:
+			tile = canvas.tiles.get(key)
+			if tile is None:
+				continue
+			x, w = zoom_span(key[0], self.zoom)
+			y, h = zoom_span(key[1], self.zoom)
+			pos = QPoint(x - self.pan.x(), y - self.pan.y())
+			target = QRect(pos, QSize(w, h)).intersected(rect)
+			if target.isEmpty():
+				continue
+			source = target.translated(-pos)
+			if self.zoom == 1.0:
+				p.drawImage(target, tile, source)
+			elif cached:
+				# Panning only moves where cached tiles land; nothing is rescaled
+				pix = self.tile_cache.pixmap(canvas, key, self.zoom, QSize(w, h))
+				p.drawPixmap(target, pix, source)
+			else:
+				# The cache holds composite tiles only; the clip keeps this to ``rect``
+				p.save()
+				p.setClipRect(target, Qt.IntersectClip)
+				p.setRenderHint(QPainter.SmoothPixmapTransform, True)
+				p.drawImage(QRect(pos, QSize(w, h)), tile)
+				p.restore()
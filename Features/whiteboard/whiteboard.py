@@ -1,47 +1,94 @@
 import sys
-from PySide6.QtCore import Qt, QRectF, QPoint
-from PySide6.QtGui import QColor, QPainter, QPen, QImage, QAction
+from PySide6.QtCore import Qt, QEvent, QRectF, QPointF
+from PySide6.QtGui import QColor, QPainter, QAction
 from PySide6.QtWidgets import QWidget
 
 from .toolbar import ToolbarMixin
 from .slider import SliderMixin
 from .tools import ToolsMixin
 from .history import HistoryMixin
+from .view import ViewMixin
+from .overlay import OverlayMixin
+from .live import LiveStrokeMixin
+from .files import BoardFileMixin
+from .autosave import AUTOSAVE_FILE, AutosaveMixin
+from .timelapse import TimelapseMixin
+from .layers import LayersMixin
+from .fill import FillMixin
+from .shapes import ShapesMixin
+from .images import ImagesMixin
+from . import instrument
+from .strokes import SHAPES, Stroke
+from .smoothing import StrokeFilter
+from .spatial import StrokeIndex
 
-class Whiteboard(QWidget, ToolbarMixin, SliderMixin, ToolsMixin, HistoryMixin):
-	def __init__(self):
+BACKGROUND = QColor("#18181C")
+OUTLINE = QColor("#1f1f28")
+
+class Whiteboard(QWidget, ToolbarMixin, SliderMixin, ToolsMixin, HistoryMixin, ViewMixin, OverlayMixin, LiveStrokeMixin, BoardFileMixin, AutosaveMixin, TimelapseMixin, LayersMixin, FillMixin, ShapesMixin, ImagesMixin):
+	def __init__(self, autosave_path=AUTOSAVE_FILE):
 		super().__init__()
+		self.autosave_path = autosave_path
 		self.setWindowTitle("Minimal Whiteboard")
 		# self.setMinimumSize(900, 600)
 		self.setAttribute(Qt.WA_OpaquePaintEvent, True)
 		self.setMouseTracking(True)
 		self.setStyleSheet("QWidget { outline: none; }")
 		self.setFocusPolicy(Qt.NoFocus)
+		self.setAcceptDrops(True)
 
 
-		self.canvas = QImage(self.size(), QImage.Format_ARGB32_Premultiplied)
-		self.canvas.fill(Qt.transparent)
-
 		self.active_tool = "pen"
 		self.pen_color = QColor("#e6e6e6")
 		self.pen_width = 4
 		self.drawing = False
-		self.last_pos = QPoint()
+		self.last_pos = QPointF()  # world coordinates
+
+		# Vector log of every stroke on the board, ordered by Stroke.seq
+		self.strokes = []
+		self.stroke_index = StrokeIndex()
+		self._stroke = None
+
+		# Per-tool simplification/smoothing applied when a stroke is committed.
+		# The eraser has already changed pixels by then, so it is only thinned.
+		self.stroke_filters = {
+			"pen": StrokeFilter(tolerance=0.75, smoothing="chaikin"),
+			"eraser": StrokeFilter(tolerance=0.5),
+		}
 
 		self.toolbar_rect = QRectF()
 		self.slider_visible = False
 		self.slider_rect = QRectF()
 		self.slider_dragging = False
-
-		self.history = []
-		self.redo_stack = []
-		self.max_history = 25
-		self._push_history()
+		self._layout_chrome()
 
 		self.addAction(self._make_shortcut("Ctrl+Z", self.undo))
 		self.addAction(self._make_shortcut("Ctrl+Shift+Z", self.redo))
 		self.addAction(self._make_shortcut("Ctrl+Y", self.redo))
 		self.addAction(self._make_shortcut("Ctrl+K", self.clear_canvas))
+		self.addAction(self._make_shortcut("Ctrl+0", self.reset_view))
+		self.addAction(self._make_shortcut("Ctrl+S", self.save_board))
+		self.addAction(self._make_shortcut("Ctrl+O", self.open_board))
+		self.addAction(self._make_shortcut("Ctrl+V", self.paste_image))
+		self.addAction(self._make_shortcut("Ctrl+T", self._toggle_replay))
+		self.addAction(self._make_shortcut("Ctrl+Shift+N", self.add_layer))
+		self.addAction(self._make_shortcut("Esc", self.cancel_fill))
+		self.addAction(self._make_shortcut("Alt+Up", lambda: self.move_layer(1)))
+		self.addAction(self._make_shortcut("Alt+Down", lambda: self.move_layer(-1)))
+
+		# Only live while replaying, so they never steal keys from drawing
+		self._replay_actions = [
+			self._make_shortcut("Space", self.play_replay),
+			self._make_shortcut("Left", lambda: self.step_replay(-1)),
+			self._make_shortcut("Right", lambda: self.step_replay(1)),
+			self._make_shortcut("[", lambda: self.replay_speed(-1)),
+			self._make_shortcut("]", lambda: self.replay_speed(1)),
+		]
+		for act in self._replay_actions:
+			act.setEnabled(False)
+			self.addAction(act)
+
+		self.restore_autosave()
 
 	def _make_shortcut(self, keyseq, slot):
 		act = QAction(self)
@@ -49,21 +96,47 @@ class Whiteboard(QWidget, ToolbarMixin, SliderMixin, ToolsMixin, HistoryMixin):
 		act.triggered.connect(slot)
 		return act
 
-	def paintEvent(self, _):
+	def _toggle_replay(self):
+		self.toggle_replay()
+		for act in self._replay_actions:
+			act.setEnabled(self.replay is not None)
+
+	def paintEvent(self, e):
+		# Only the invalidated area is repainted; while drawing that is the
+		# bounding box of the newest segments, not the whole window.
+		dirty = e.rect()
 		p = QPainter(self)
-		p.fillRect(self.rect(), QColor("#18181C"))
-		p.setPen(QColor("#1f1f28")) # show think outline but why?
+		p.setClipRegion(e.region())
+		p.fillRect(dirty, BACKGROUND)
+		p.setPen(OUTLINE) # show think outline but why?
 		p.drawRect(self.rect().adjusted(0, 0, -1, -1))
 
-		p.drawImage(0, 0, self.canvas)
+		above = self._layers_above_preview()
+		if above:
+			# The stroke or shape being drawn goes on the active layer, under
+			# the visible layers stacked on top of it
+			stack = self.layers.layers
+			self._paint_layer_tiles(p, dirty, stack[:len(stack) - len(above)])
+			self._paint_live_stroke(p)
+			self._paint_shape(p)
+			self._paint_layer_tiles(p, dirty, above)
+		else:
+			self._paint_tiles(p, dirty)
+			self._paint_live_stroke(p)
+			self._paint_shape(p)
+		self._paint_imports(p)
+		self._paint_replay(p)
+		self._paint_fill_progress(p)
 
-		self._compute_toolbar_rect()
-		self._compute_slider_rect()
-		self._paint_toolbar(p)
-		if self.slider_visible:
-			self._paint_slider(p)
+		# Toolbar, slider and layers panel come from cached pixmaps, redrawn
+		# only when what they show changes
+		self._paint_overlay(p, dirty)
 
 	def mousePressEvent(self, e):
+		if e.button() == Qt.MiddleButton:
+			self.panning = True
+			self._pan_anchor = e.position().toPoint()
+			return
 		if e.button() != Qt.LeftButton:
 			return
 		pos = e.position().toPoint()
@@ -73,6 +146,10 @@ class Whiteboard(QWidget, ToolbarMixin, SliderMixin, ToolsMixin, HistoryMixin):
 			self._update_slider_from_pos(pos.x())
 			return
 
+		if self.layers_rect.contains(pos):
+			self._layers_press(pos)
+			return
+
 		if self.toolbar_rect.contains(pos):
 			for name, rect in self.btn_rects.items():
 				if rect.contains(pos):
@@ -80,6 +157,12 @@ class Whiteboard(QWidget, ToolbarMixin, SliderMixin, ToolsMixin, HistoryMixin):
 						self.set_pen()
 					elif name == "eraser":
 						self.set_eraser()
+					elif name == "stroke_eraser":
+						self.set_stroke_eraser()
+					elif name in SHAPES:
+						self.set_shape(name)
+					elif name == "fill":
+						self.set_fill()
 					elif name == "clear":
 						self.clear_canvas()
 					elif name == "undo":
@@ -91,54 +174,138 @@ class Whiteboard(QWidget, ToolbarMixin, SliderMixin, ToolsMixin, HistoryMixin):
 					return
 			return
 
+		if self.replay is not None:
+			if self.replay_rect.contains(pos):
+				self.replay_seeking = True
+				self._seek_replay_to(pos.x())
+			return
+		if self.loading or self.filling:
+			# Strokes still streaming in would land on top of new ones, and a
+			# fill in flight was computed from the pixels as they were
+			return
+		if not self.layers.active.visible:
+			# Nothing would show; the panel has the layer greyed out
+			return
+		if self.active_tool == "fill":
+			self.start_fill(self.to_world(pos))
+			return
+		if self.active_tool in SHAPES:
+			self._begin_shape(self.to_world(pos))
+			return
 		self.drawing = True
+		pos = self.to_world(pos)
 		self.last_pos = pos
-		self._draw_to(pos)
+		self._stroke = Stroke(self.active_tool, self.pen_color, self.pen_width, layer=self.layers.active.id)
+		self._begin_history()
+		self._queue_point(pos)
 
 	def mouseMoveEvent(self, e):
 		pos = e.position().toPoint()
+		if self.panning:
+			delta = pos - self._pan_anchor
+			self._pan_anchor = pos
+			self.pan_by(delta.x(), delta.y())
+			return
 		if self.slider_dragging:
 			self._update_slider_from_pos(pos.x())
 			return
-		if self.drawing:
-			self._draw_to(pos)
+		if self.replay_seeking:
+			self._seek_replay_to(pos.x())
+			return
+		if self._shape is not None:
+			self._drag_shape(self.to_world(pos))
+		elif self.drawing:
+			self._queue_point(self.to_world(pos))
 
 	def mouseReleaseEvent(self, e):
+		if e.button() == Qt.MiddleButton:
+			self.panning = False
 		if e.button() == Qt.LeftButton:
-			if self.drawing:
+			if self._shape is not None:
+				self._commit_shape()
+			elif self.drawing:
 				self.drawing = False
-				self._push_history()
+				self._commit_stroke()
 			self.slider_dragging = False
+			self.replay_seeking = False
 
-	def _draw_to(self, pos: QPoint):
-		painter = QPainter(self.canvas)
-		painter.setRenderHint(QPainter.Antialiasing, True)
-
-		if self.active_tool == "eraser":
-			painter.setCompositionMode(QPainter.CompositionMode_Clear)
-			pen = QPen(Qt.transparent, self.pen_width, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+	def wheelEvent(self, e):
+		if self.layers_rect.contains(e.position()):
+			self._layers_wheel(e.position(), e.angleDelta().y())
+		elif e.modifiers() & Qt.ControlModifier:
+			self.zoom_at(e.position(), 1 if e.angleDelta().y() > 0 else -1)
 		else:
-			painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
-			pen = QPen(self.pen_color, self.pen_width, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+			d = e.angleDelta()
+			self.pan_by(d.x() / 2, d.y() / 2)
 
-		painter.setPen(pen)
-		painter.drawLine(self.last_pos, pos)
-		painter.end()
+	def dragEnterEvent(self, e):
+		mime = e.mimeData()
+		if mime.hasImage() or any(url.isLocalFile() for url in mime.urls()):
+			e.acceptProposedAction()
 
-		self.last_pos = pos
-		self.update()
+	def dropEvent(self, e):
+		if self._import_mime(e.mimeData(), self.to_world(e.position())):
+			e.acceptProposedAction()
 
 	def resizeEvent(self, _):
-		if self.canvas.size() != self.size():
-			new_img = QImage(self.size(), QImage.Format_ARGB32_Premultiplied)
-			new_img.fill(Qt.transparent)
-			p = QPainter(new_img)
-			p.drawImage(0, 0, self.canvas)
-			p.end()
-			self.canvas = new_img
+		self._layout_chrome()
+
+	def changeEvent(self, e):
+		if e.type() in (QEvent.PaletteChange, QEvent.StyleChange):
+			self.icon_atlas.invalidate()
+			self.invalidate_overlay()
+			self.update()
+		super().changeEvent(e)
+
+	def hideEvent(self, e):
+		# Switching to another page leaves the board
+		self.cancel_fill()
+		super().hideEvent(e)
+
+	def closeEvent(self, e):
+		self.cancel_fill()
+		self.flush_autosave()
+		super().closeEvent(e)
+
+	@property
+	def releasable(self):
+		# Closing saves the board and a new Whiteboard restores it
+		return self.autosave_path is not None
+
+	def memory_bytes(self):
+		# Layer, composite, history and timeline tiles are often the same
+		# shared QImage, so every image is counted once by its cache key
+		images = {}
+
+		def count(imgs):
+			for img in imgs:
+				if img is not None:
+					images.setdefault(img.cacheKey(), img.sizeInBytes())
+
+		for canvas in [layer.canvas for layer in self.layers] + [self.layers.composite]:
+			count(canvas.tiles.values())
+		blobs = 0
+		for entry in self.history.undo_stack + self.history.redo_stack:
+			if entry.tiles is not None:
+				count(img for pair in entry.tiles.values() for img in pair)
+			if entry.blob is not None:
+				blobs += len(entry.blob)
+		for checkpoint in self.timeline.checkpoints:
+			count(checkpoint.tiles.values())
+		pictures = {id(s.picture): s.picture for s in self.strokes if s.tool == "image"}
+		count(p.image for p in pictures.values())
+		return (
+			sum(images.values()) + self.tile_cache.nbytes + blobs
+			+ sum(len(p.data) for p in pictures.values())
+			+ sum(len(s.points) * s.points.itemsize for s in self.strokes)
+		)
 
 	def contextMenuEvent(self, _):
-		if self.active_tool == "pen":
+		if self.active_tool in ("pen", "fill"):
 			self.slider_visible = not self.slider_visible
 			self.update()
 		
+
+
+if instrument.ENABLED:
+	Whiteboard = instrument.instrumented(Whiteboard)
@@ -1,24 +1,19 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QSizePolicy, QScrollArea, QFrame
 from PySide6.QtCore import Qt, Signal, QSize
-from PySide6.QtGui import QIcon
 
-from Utils.load_stylesheet import load_stylesheet
+from Utils import assets
+from Utils.load_stylesheet import apply_stylesheet
 
 
 class NavBar(QWidget):
-	# Signals for modular handling
-	homeClicked = Signal()
-	projectsClicked = Signal()
-	brainstormClicked = Signal()
-	whiteboardClicked = Signal()
-	settingsClicked = Signal()
+	sceneClicked = Signal(str)  # the name of a page in UI.scenes.SCENES
 
-	def __init__(self):
+	def __init__(self, scenes):
 		super().__init__()
 		self.setFixedWidth(135)
 		self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Expanding)
 
-		self.setStyleSheet(load_stylesheet("UI/stylesheet/navbar.qss"))
+		apply_stylesheet(self, "UI/stylesheet/navbar.qss")
 
 		main_layout = QVBoxLayout(self)
 		main_layout.setContentsMargins(0, 0, 0, 0)
@@ -31,24 +26,16 @@ class NavBar(QWidget):
 		top_layout.setSpacing(0)
 
 		# Helper to make button with icon + text
-		def make_btn(icon_path, text, slot):
-			btn = QPushButton(text)
-			btn.setIcon(QIcon(f"assets/icons/{icon_path}.svg"))
+		def make_btn(scene):
+			btn = QPushButton(scene.title)
+			btn.setIcon(assets.icon(scene.icon))
 			btn.setIconSize(QSize(20, 20))  # adjust size as needed
-			btn.clicked.connect(slot)
+			btn.clicked.connect(lambda: self.sceneClicked.emit(scene.name))
 			return btn
 
-		btn_home = make_btn("home", "Home", self.homeClicked.emit)
-		top_layout.addWidget(btn_home)
-
-		btn_projects = make_btn("projects", "Projects", self.projectsClicked.emit)
-		top_layout.addWidget(btn_projects)
-
-		btn_brainstorm = make_btn("brainstorm", "Brainstorm", self.brainstormClicked.emit)
-		top_layout.addWidget(btn_brainstorm)
-
-		btn_whiteboard = make_btn("whiteboard", "Whiteboard", self.whiteboardClicked.emit)
-		top_layout.addWidget(btn_whiteboard)
+		for scene in scenes:
+			if not scene.bottom:
+				top_layout.addWidget(make_btn(scene))
 
 		# Keep items packed at top
 		top_layout.addStretch(1)
@@ -66,7 +53,8 @@ class NavBar(QWidget):
 		bottom_layout = QVBoxLayout(bottom)
 		bottom_layout.setContentsMargins(0, 0, 0, 0)
 
-		btn_settings = make_btn("settings", "Settings", self.settingsClicked.emit)
-		bottom_layout.addWidget(btn_settings)
+		for scene in scenes:
+			if scene.bottom:
+				bottom_layout.addWidget(make_btn(scene))
 
 		main_layout.addWidget(bottom)
@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QSizePolicy, QStackedWidget
+
+
+class SceneStack(QStackedWidget):
+	"""Pages built on first visit and kept alive, least recently used first.
+
+	Going back to a page that is still alive is just a switch. A page can
+	opt in to being released by defining ``memory_bytes()`` and a true
+	``releasable``: when the releasable pages hidden in the background hold
+	more than ``budget`` bytes, or one has been idle for ``idle_s``, the
+	least recently used is closed (which is where it saves its state) and
+	deleted. Its next visit builds it again from that saved state. Other
+	pages are never released.
+	"""
+
+	def __init__(self, factories, budget=512 * 1024 * 1024, idle_s=600.0, parent=None):
+		super().__init__(parent)
+		self.factories = factories  # name -> callable building the page
+		self.budget = budget
+		self.idle_s = idle_s
+		self.scenes = OrderedDict()  # name -> widget, least recently shown first
+		self._hidden_at = {}  # name -> monotonic time it went to the background
+		self._timer = QTimer(self)
+		self._timer.timeout.connect(self.release_idle)
+		self._timer.start(60 * 1000)
+
+	def show_scene(self, name):
+		widget = self.scenes.get(name)
+		if widget is None:
+			factory = self.factories.get(name)
+			if factory is None:
+				return None
+			widget = factory()
+			widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+			self.addWidget(widget)
+			self.scenes[name] = widget
+		current = self.current_name()
+		if current is not None and current != name:
+			self._hidden_at[current] = time.monotonic()
+		self._hidden_at.pop(name, None)
+		self.scenes.move_to_end(name)
+		self.setCurrentWidget(widget)
+		self.release_idle()
+		return widget
+
+	def current_name(self):
+		current = self.currentWidget()
+		for name, widget in self.scenes.items():
+			if widget is current:
+				return name
+		return None
+
+	def release(self, name):
+		widget = self.scenes.pop(name, None)
+		if widget is None:
+			return
+		self._hidden_at.pop(name, None)
+		widget.close()
+		self.removeWidget(widget)
+		widget.deleteLater()
+
+	def release_idle(self):
+		now = time.monotonic()
+		background = [
+			name for name, w in self.scenes.items()
+			if w is not self.currentWidget() and getattr(w, "releasable", False)
+		]
+		held = sum(self.scenes[name].memory_bytes() for name in background)
+		for name in background:  # least recently shown first
+			if held <= self.budget and now - self._hidden_at.get(name, now) < self.idle_s:
+				continue
+			held -= self.scenes[name].memory_bytes()
+			self.release(name)
+
+	def close_all(self):
+		for name in list(self.scenes):
+			self.release(name)
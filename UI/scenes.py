@@ -0,0 +1,99 @@
+"""The pages of the main window.
+
+Each page is registered with the name the navigation uses, its nav icon
+and label, and what builds it: a callable, or a ``"module:attribute"``
+string that is only imported the first time the page is opened. Adding a
+page is one ``register`` call; the NavBar and MainWindow are built from
+``SCENES``.
+"""
+import importlib
+
+from PySide6.QtCore import QEvent, QObject, Qt, QTimer
+from PySide6.QtWidgets import QLabel
+
+
+class Scene:
+	__slots__ = ("name", "title", "icon", "target", "bottom")
+
+	def __init__(self, name, title, icon, target, bottom=False):
+		self.name = name
+		self.title = title
+		self.icon = icon  # Utils.assets icon name
+		self.target = target
+		self.bottom = bottom  # pinned under the scrolling nav buttons
+
+	@property
+	def loaded(self):
+		return not isinstance(self.target, str)
+
+	def load(self):
+		"""Import the page's module if needed and return what builds it."""
+		if not self.loaded:
+			module, attr = self.target.split(":")
+			self.target = getattr(importlib.import_module(module), attr)
+		return self.target
+
+	def build(self):
+		return self.load()()
+
+
+SCENES = {}  # name -> Scene, in nav order
+
+
+def register(name, title, icon, target, bottom=False):
+	SCENES[name] = Scene(name, title, icon, target, bottom)
+
+
+def prewarm(scenes=None, delay_ms=0):
+	"""Import the pages not opened yet, one per event loop pass.
+
+	Meant to be started once the window is on screen (see
+	``prewarm_after_paint``): the imports then happen while the user looks
+	at it instead of on the first click.
+	"""
+	pending = [s for s in (scenes or SCENES.values()) if not s.loaded]
+
+	def step():
+		if pending:
+			pending.pop(0).load()
+			QTimer.singleShot(delay_ms, step)
+
+	QTimer.singleShot(delay_ms, step)
+
+
+class _FirstPaint(QObject):
+	def __init__(self, window, start):
+		super().__init__(window)
+		self.start = start
+
+	def eventFilter(self, obj, e):
+		if e.type() == QEvent.Paint:
+			# Runs once the frame this paint belongs to is on screen
+			obj.removeEventFilter(self)
+			QTimer.singleShot(0, self.start)
+			self.deleteLater()
+		return False
+
+
+def prewarm_after_paint(window, scenes=None):
+	"""``prewarm`` once ``window`` has painted its first frame.
+
+	A timer started right after ``show()`` can fire before that paint and
+	hold it up with the imports.
+	"""
+	window.installEventFilter(_FirstPaint(window, lambda: prewarm(scenes)))
+
+
+def _page(text):
+	def build():
+		label = QLabel(text)
+		label.setAlignment(Qt.AlignCenter)
+		return label
+	return build
+
+
+register("home", "Home", "home", _page("🏠 Home Page"))
+register("projects", "Projects", "projects", _page("📂 Projects Page"))
+register("brainstorm", "Brainstorm", "brainstorm", "Features.brain_storm.brainStrom:BrainStorm")
+register("whiteboard", "Whiteboard", "whiteboard", "Features.whiteboard.whiteboard:Whiteboard")
+register("settings", "Settings", "settings", _page("⚙ Settings Page"), bottom=True)
@@ -0,0 +1,111 @@
+"""Icons and other files under ``assets/``, shared by every widget.
+
+Paths are resolved against the repository, not the working directory.
+Each SVG is parsed once: ``svg()`` hands out one QSvgRenderer per file and
+``icon()`` one QIcon, and ``pixmap()`` caches rasterized sizes.
+
+When ``assets/assets.rcc`` exists it is registered as a Qt resource bundle
+and files are read from that one mapped file instead of one filesystem hit
+each; anything missing from it still comes from disk. Build the bundle
+after changing assets with
+
+	python -m Utils.assets
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+from PySide6.QtCore import QFile, QRectF, QResource, Qt
+from PySide6.QtGui import QIcon, QPainter, QPixmap
+
+ROOT = Path(__file__).resolve().parent.parent
+ASSETS = ROOT / "assets"
+BUNDLE = ASSETS / "assets.rcc"
+
+_bundle = None  # True once registered, False when there is none
+_renderers = {}
+_icons = {}
+_pixmaps = {}
+
+
+def load_bundle(path=BUNDLE):
+	global _bundle
+	if _bundle is None:
+		_bundle = Path(path).exists() and QResource.registerResource(str(path))
+	return _bundle
+
+
+def path(name):
+	"""The path Qt should open for ``name``, relative to ``assets/``."""
+	if load_bundle():
+		resource = f":/assets/{name}"
+		if QFile.exists(resource):
+			return resource
+	return str(ASSETS / name)
+
+
+def icon_path(name):
+	return path(f"icons/{name}.svg")
+
+
+def svg(name):
+	"""The shared renderer for ``assets/icons/<name>.svg``."""
+	renderer = _renderers.get(name)
+	if renderer is None:
+		from PySide6.QtSvg import QSvgRenderer  # QtSvg only once an icon is drawn by hand
+
+		renderer = _renderers[name] = QSvgRenderer(icon_path(name))
+	return renderer
+
+
+def icon(name):
+	icon = _icons.get(name)
+	if icon is None:
+		icon = _icons[name] = QIcon(icon_path(name))
+	return icon
+
+
+def pixmap(name, size, dpr=1.0):
+	"""``name`` rasterized to ``size`` logical pixels square."""
+	key = (name, size, dpr)
+	pm = _pixmaps.get(key)
+	if pm is None:
+		px = max(1, round(size * dpr))
+		pm = QPixmap(px, px)
+		pm.fill(Qt.transparent)
+		p = QPainter(pm)
+		p.setRenderHint(QPainter.Antialiasing, True)
+		svg(name).render(p, QRectF(0, 0, px, px))
+		p.end()
+		pm.setDevicePixelRatio(dpr)
+		_pixmaps[key] = pm
+	return pm
+
+
+def preload(names):
+	"""Parse the named icons now, e.g. while the app is idle after startup."""
+	for name in names:
+		svg(name)
+
+
+def build_bundle(out=BUNDLE):
+	"""Pack every file under ``assets/`` into a binary resource bundle."""
+	qrc = ASSETS / "assets.qrc"
+	files = sorted(
+		p.relative_to(ASSETS).as_posix() for p in ASSETS.rglob("*")
+		if p.is_file() and p not in (Path(out), qrc)
+	)
+	qrc.write_text(
+		'<!DOCTYPE RCC><RCC version="1.0">\n<qresource>\n'
+		+ "".join(f'\t<file alias="assets/{f}">{f}</file>\n' for f in files)
+		+ "</qresource>\n</RCC>\n"
+	)
+	try:
+		subprocess.run(["pyside6-rcc", "--binary", "-o", str(out), str(qrc)], check=True)
+	finally:
+		qrc.unlink()
+
+
+if __name__ == "__main__":
+	build_bundle()
+	print(f"wrote {BUNDLE}", file=sys.stderr)
@@ -1,3 +1,125 @@
+"""Cached QSS loading with variables, includes and hot reload.
+
+A stylesheet may define variables and pull in other files; both are
+resolved once when the file is loaded:
+
+	@import "textField.qss";
+	@background: #18181C;
+	QWidget { background-color: @background; }
+
+Relative paths are resolved against the repository, includes against the
+including file. Loaded text is cached per file until the file or one of
+its includes changes on disk. Widgets styled with ``apply_stylesheet`` get
+the new text as soon as that happens, so a sheet can be edited while the
+app runs.
+"""
+import os
+import re
+import weakref
+from pathlib import Path
+
+from PySide6.QtCore import QCoreApplication, QFileSystemWatcher
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_IMPORT = re.compile(r'^\s*@import\s+"([^"]+)"\s*;\s*$', re.M)
+_DEFINE = re.compile(r"^\s*@([A-Za-z_][\w-]*)\s*:\s*(.*?)\s*;\s*$", re.M)
+_USE = re.compile(r"@([A-Za-z_][\w-]*)")
+
+_cache = {}  # path -> (text, files it was read from, their mtimes)
+_styled = {}  # path -> widgets to restyle when it changes
+_watcher = None
+_watched = set()  # cached paths the watcher keeps up to date
+
+
+def _resolve(filename):
+	path = Path(filename)
+	return str(path if path.is_absolute() else ROOT / path)
+
+
+def _read(path, variables, files, seen=()):
+	if path in seen:
+		raise ValueError(f"{path} includes itself")
+	with open(path, "r") as file:
+		text = file.read()
+	files.append(path)
+	base = os.path.dirname(path)
+
+	def include(m):
+		return _read(os.path.join(base, m.group(1)), variables, files, (*seen, path))
+
+	text = _IMPORT.sub(include, text)
+
+	def define(m):
+		variables[m.group(1)] = m.group(2)
+		return ""
+
+	return _DEFINE.sub(define, text)
+
+
+def _load(path):
+	variables, files = {}, []
+	text = _read(path, variables, files)
+	text = _USE.sub(lambda m: variables.get(m.group(1), m.group(0)), text)
+	return text, files, [os.stat(f).st_mtime_ns for f in files]
+
+
+def _watch(files):
+	global _watcher
+	if _watcher is None:
+		if QCoreApplication.instance() is None:
+			return False
+		_watcher = QFileSystemWatcher()
+		_watcher.fileChanged.connect(_changed)
+	missing = [f for f in files if f not in _watcher.files()]
+	if missing:
+		_watcher.addPaths(missing)
+	return True
+
+
+def _changed(changed):
+	for path, (_, files, _) in list(_cache.items()):
+		if changed not in files:
+			continue
+		del _cache[path]
+		_watched.discard(path)
+		widgets = _styled.get(path, ())
+		if widgets:
+			try:
+				text = load_stylesheet(path)
+			except (OSError, ValueError):
+				continue  # mid-save; the next change brings it back
+			for widget in list(widgets):
+				try:
+					widget.setStyleSheet(text)
+				except RuntimeError:  # deleted on the C++ side
+					widgets.discard(widget)
+	if os.path.exists(changed) and changed not in _watcher.files():
+		# Editors that save by replacing the file drop it from the watcher
+		_watcher.addPath(changed)
+
+
 def load_stylesheet(filename):
-	with open(filename, "r") as file:
-		return file.read()
\ No newline at end of file
+	path = _resolve(filename)
+	hit = _cache.get(path)
+	if hit is not None:
+		text, files, mtimes = hit
+		# Files loaded before there was an app to watch them are checked
+		# on every call instead
+		if path in _watched or all(os.stat(f).st_mtime_ns == m for f, m in zip(files, mtimes)):
+			return text
+	hit = _cache[path] = _load(path)
+	if _watch(hit[1]):
+		_watched.add(path)
+	return hit[0]
+
+
+def apply_stylesheet(widget, filename):
+	"""Style ``widget`` (and so its children) and restyle it on changes.
+
+	Prefer one call on a parent over styling each child: every widget with
+	its own sheet is polished separately.
+	"""
+	path = _resolve(filename)
+	widget.setStyleSheet(load_stylesheet(path))
+	_styled.setdefault(path, weakref.WeakSet()).add(widget)
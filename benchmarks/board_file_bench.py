@@ -0,0 +1,140 @@
+"""Compare .xpf board files against a flat PNG dump of the same board.
+
+Run from the repository root:
+
+	QT_QPA_PLATFORM=offscreen python -m benchmarks.board_file_bench [strokes]
+
+Reports file size, save time, time until the first viewport has been
+painted, and time until the whole board is loaded.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from array import array
+
+from PySide6.QtCore import QPoint, QRect, Qt
+from PySide6.QtGui import QImage, QPainter
+from PySide6.QtWidgets import QApplication
+
+
+def make_board(board, count, seed=7):
+	from Features.whiteboard.strokes import Stroke
+
+	rng = random.Random(seed)
+	for _ in range(count):
+		x, y = rng.uniform(-3000, 3000), rng.uniform(-3000, 3000)
+		pts = array("f")
+		for _ in range(rng.randint(20, 200)):
+			x += rng.uniform(-6, 6)
+			y += rng.uniform(-6, 6)
+			pts.extend((x, y))
+		stroke = Stroke("pen", 0xFF000000 | rng.getrandbits(24), rng.choice((2, 4, 8)), pts)
+		board.canvas.paint(stroke.bounds().toAlignedRect(), stroke.render)
+		board._swap_strokes((), [stroke])
+
+
+def png_dump(board, path):
+	from Features.whiteboard.canvas import TILE_SIZE
+
+	keys = list(board.canvas.tiles)
+	left = min(k[0] for k in keys)
+	top = min(k[1] for k in keys)
+	right = max(k[0] for k in keys) + 1
+	bottom = max(k[1] for k in keys) + 1
+	img = QImage((right - left) * TILE_SIZE, (bottom - top) * TILE_SIZE, QImage.Format_ARGB32_Premultiplied)
+	img.fill(Qt.transparent)
+	p = QPainter(img)
+	for (tx, ty), tile in board.canvas.tiles.items():
+		p.drawImage(QPoint((tx - left) * TILE_SIZE, (ty - top) * TILE_SIZE), tile)
+	p.end()
+	img.save(path, "PNG")
+
+
+def png_load(path, viewport):
+	t = time.perf_counter()
+	img = QImage(path)
+	img.copy(viewport)  # the whole file has to be decoded before anything shows
+	first = time.perf_counter() - t
+	return first, first
+
+
+def _viewport_pending(board):
+	from Features.whiteboard.canvas import tiles_in_rect
+
+	load = board._load
+	if load is None:
+		return False
+	if load.raster:
+		# Tiles on screen are drawn as stroke batches land, and complete once
+		# the last one has
+		visible = set(tiles_in_rect(board.world_rect(board.rect())))
+		return bool(load.strokes) or any(key in visible for _, key in load.raster_keys)
+	return False  # tiles on screen are read by load_board itself
+
+
+def xpf_load(board_cls, path, timeout=60):
+	# The rest of the board streams in from the load timer, as it does in
+	# the app, so the event loop has to run until it is done
+	app = QApplication.instance()
+	board = board_cls(autosave_path=None)  # keep the user's autosave out of it
+	board.resize(1280, 800)
+	board.show()
+	app.processEvents()
+	t = time.perf_counter()
+	board.load_board(path)
+	first = None
+	while board.loading or first is None:
+		if first is None and not _viewport_pending(board):
+			board.repaint()
+			first = time.perf_counter() - t
+		if time.perf_counter() - t > timeout:
+			raise RuntimeError(f"{path} did not finish loading in {timeout} s")
+		app.processEvents()
+	full = time.perf_counter() - t
+	board.close()
+	return first, full
+
+
+def timed(fn, *args):
+	t = time.perf_counter()
+	fn(*args)
+	return time.perf_counter() - t
+
+
+def main():
+	count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+	app = QApplication.instance() or QApplication([])
+	from Features.whiteboard.board_file import write_board
+	from Features.whiteboard.whiteboard import Whiteboard
+
+	board = Whiteboard(autosave_path=None)
+	board.resize(1280, 800)
+	make_board(board, count)
+	tmp = tempfile.mkdtemp()
+
+	def save_xpf(path, tiles):
+		with open(path, "wb") as f:
+			write_board(f, board.strokes, board.layers.tiles() if tiles else None)
+
+	rows = []
+	for name, save, load in (
+		("xpf", lambda p: save_xpf(p, False), lambda p: xpf_load(Whiteboard, p)),
+		("xpf + tile cache", lambda p: save_xpf(p, True), lambda p: xpf_load(Whiteboard, p)),
+		("png dump", lambda p: png_dump(board, p), lambda p: png_load(p, QRect(0, 0, 1280, 800))),
+	):
+		path = os.path.join(tmp, name.replace(" ", "-"))
+		save_s = timed(save, path)
+		first_s, full_s = load(path)
+		rows.append((name, os.path.getsize(path), save_s, first_s, full_s))
+
+	print(f"{count} strokes, {len(board.canvas.tiles)} tiles")
+	print(f"{'format':<20}{'bytes':>12}{'save ms':>10}{'first ms':>10}{'full ms':>10}")
+	for name, size, save_s, first_s, full_s in rows:
+		print(f"{name:<20}{size:>12}{save_s * 1e3:>10.1f}{first_s * 1e3:>10.1f}{full_s * 1e3:>10.1f}")
+	app.processEvents()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,213 @@
+"""Time how long XpoFlow takes to get its window on screen.
+
+Run from the repository root:
+
+	python -m benchmarks.startup_bench [options]
+
+Every run starts a fresh interpreter with ``-X importtime`` and the
+offscreen platform, builds MainWindow and waits for its first paint. The
+phases are timed from inside that process, imports are read from the
+importtime log, and the min and median over all runs are written as JSON:
+
+	--runs N           how many cold starts to time (default 7)
+	--out PATH         write the results there instead of stdout
+	--imports N        how many of the slowest imports to list (default 15)
+	--compare PATH     compare against an earlier run; exits 1 when a
+	                   median got more than --tolerance slower
+
+All times are in milliseconds. ``interpreter_ms`` runs from spawning the
+process to the first line of the child, so it includes Python's own
+startup and site imports.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHILD = "from benchmarks.startup_bench import child; child({start!r})"
+PHASES = (
+	"interpreter_ms", "qt_import_ms", "app_ms", "main_import_ms", "navbar_ms", "stylesheet_ms",
+	"icons_ms", "window_ms", "first_paint_ms", "total_ms",
+)
+
+
+def child(started):
+	"""Runs in the timed process; prints the phase times as JSON.
+
+	``started`` is the time.time() at which the parent spawned it.
+	"""
+	t0 = time.perf_counter()
+	clock = {"stylesheet_ms": 0.0, "icons_ms": 0.0}
+
+	def since(t):
+		return (time.perf_counter() - t) * 1e3
+
+	t = time.perf_counter()
+	from PySide6.QtCore import QEvent, QObject
+	from PySide6.QtWidgets import QApplication
+	clock["qt_import_ms"] = since(t)
+
+	t = time.perf_counter()
+	app = QApplication([])
+	clock["app_ms"] = since(t)
+
+	t = time.perf_counter()
+	import main
+	import UI.components.NavBar as navbar
+	clock["main_import_ms"] = since(t)
+
+	# Stylesheets and icons are timed where the NavBar module looks them up
+	apply_stylesheet, icon = navbar.apply_stylesheet, navbar.assets.icon
+
+	def timed_stylesheet(*args, **kwargs):
+		t = time.perf_counter()
+		try:
+			return apply_stylesheet(*args, **kwargs)
+		finally:
+			clock["stylesheet_ms"] += since(t)
+
+	def timed_icon(*args):
+		t = time.perf_counter()
+		try:
+			return icon(*args)
+		finally:
+			clock["icons_ms"] += since(t)
+
+	navbar.apply_stylesheet, navbar.assets.icon = timed_stylesheet, timed_icon
+	build = navbar.NavBar.__init__
+
+	def timed_navbar(self, *args, **kwargs):
+		t = time.perf_counter()
+		build(self, *args, **kwargs)
+		clock["navbar_ms"] = since(t)
+
+	navbar.NavBar.__init__ = timed_navbar
+
+	class FirstPaint(QObject):
+		painted = False
+
+		def eventFilter(self, obj, e):
+			if e.type() == QEvent.Paint:
+				FirstPaint.painted = True
+			return False
+
+	watcher = FirstPaint()
+	app.installEventFilter(watcher)
+	t = time.perf_counter()
+	win = main.MainWindow()
+	clock["window_ms"] = since(t)
+
+	t = time.perf_counter()
+	win.show()
+	while not FirstPaint.painted:
+		app.processEvents()
+	app.processEvents()  # the rest of the window's first frame
+	clock["first_paint_ms"] = since(t)
+	clock["total_ms"] = (time.time() - started) * 1e3
+	clock["interpreter_ms"] = clock["total_ms"] - since(t0)
+	print(json.dumps(clock), flush=True)
+	os._exit(0)  # teardown is not part of startup
+
+
+def parse_importtime(log):
+	"""``{module: (self_ms, cumulative_ms)}`` from a ``-X importtime`` log."""
+	out = {}
+	for line in log.splitlines():
+		if not line.startswith("import time:") or "[us]" in line:
+			continue
+		self_us, cumulative_us, name = line[len("import time:"):].split("|")
+		out[name.strip()] = (int(self_us) / 1e3, int(cumulative_us) / 1e3)
+	return out
+
+
+def run_once():
+	env = dict(os.environ, QT_QPA_PLATFORM="offscreen", XPOFLOW_INSTRUMENT="")
+	start = time.time()
+	proc = subprocess.run(
+		[sys.executable, "-X", "importtime", "-c", CHILD.format(start=start)],
+		cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+	)
+	if proc.returncode != 0:
+		raise RuntimeError(f"startup run failed:\n{proc.stderr[-2000:]}")
+	phases = json.loads(proc.stdout.strip().splitlines()[-1])
+	return phases, parse_importtime(proc.stderr)
+
+
+def summarize(values):
+	return {"min": round(min(values), 2), "median": round(statistics.median(values), 2)}
+
+
+def run(runs, top):
+	phases, imports = {name: [] for name in PHASES}, {}
+	for _ in range(runs):
+		clock, modules = run_once()
+		for name in PHASES:
+			phases[name].append(clock[name])
+		for name, times in modules.items():
+			imports.setdefault(name, []).append(times)
+
+	own = ("benchmarks", "benchmarks.startup_bench")
+	cumulative = {
+		name: summarize([c for _, c in times]) for name, times in imports.items()
+		if len(times) == runs and name not in own
+	}
+	slowest = sorted(
+		((name, summarize([s for s, _ in times])) for name, times in imports.items() if name not in own),
+		key=lambda item: -item[1]["median"],
+	)[:top]
+	return {
+		"python": platform.python_version(),
+		"runs": runs,
+		"phases": {name: summarize(values) for name, values in phases.items()},
+		"app_imports_ms": {
+			name: stats for name, stats in cumulative.items()
+			if name.split(".")[0] in ("main", "UI", "Features", "Utils", "PySide6", "numpy")
+		},
+		"slowest_imports_self_ms": dict(slowest),
+	}
+
+
+def compare(old, new, tolerance):
+	"""Lines describing phases whose median got slower than ``tolerance`` allows."""
+	worse = []
+	for name, stats in new["phases"].items():
+		a, b = old.get("phases", {}).get(name, {}).get("median"), stats["median"]
+		# Below a millisecond it is mostly noise
+		if a is not None and b > max(a, 1.0) * (1 + tolerance):
+			worse.append(f"{name}: {a} -> {b} ms")
+	return worse
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+	parser.add_argument("--runs", type=int, default=7)
+	parser.add_argument("--out")
+	parser.add_argument("--imports", type=int, default=15)
+	parser.add_argument("--compare")
+	parser.add_argument("--tolerance", type=float, default=0.25)
+	args = parser.parse_args(argv)
+
+	results = run(args.runs, args.imports)
+	text = json.dumps(results, indent=2)
+	if args.out:
+		with open(args.out, "w") as f:
+			f.write(text + "\n")
+	else:
+		print(text)
+
+	if args.compare:
+		with open(args.compare) as f:
+			worse = compare(json.load(f), results, args.tolerance)
+		for line in worse:
+			print("slower:", line, file=sys.stderr)
+		return 1 if worse else 0
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,339 @@
+"""Replay pointer traces through a Whiteboard and time input and painting.
+
+Run from the repository root:
+
+	QT_QPA_PLATFORM=offscreen python -m benchmarks.whiteboard_bench [options]
+
+Each trace is fed to the real mouse handlers, and once per 60 Hz frame of
+trace time the queued points are flushed and pending paints delivered, as
+the event loop would. Paint times are those of whole paintEvent calls.
+Bucket fills over a 4K board are timed as well, empty and covered in
+dabs. The results are written as JSON:
+
+	--out PATH         write the results there instead of stdout
+	--trace PATH       also replay a recorded trace (repeatable)
+	--only NAME        run only the named traces (repeatable)
+	--no-fill          skip the fill timings
+	--compare PATH     compare against an earlier run; exits 1 when a
+	                   percentile got more than --tolerance slower
+	--record PATH      open a board and save what is drawn on it as a trace
+
+A trace is ``{"name": str, "size": [w, h], "strokes": [[[ms, x, y], ...]]}``
+in widget coordinates.
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+
+from PySide6 import __version__ as PYSIDE_VERSION
+from PySide6.QtCore import QEvent, QObject, QPointF, Qt
+from PySide6.QtGui import QMouseEvent
+from PySide6.QtWidgets import QApplication
+
+FRAME_MS = 1000 / 60
+SIZE = (1280, 800)
+# Traces stay inside this part of the window, clear of the toolbar and
+# the layers panel
+AREA = (40, 140, 1040, 640)
+
+
+def scribble_trace(seed=1):
+	"""Fast back-and-forth scribbling sampled at 1 kHz."""
+	rng = random.Random(seed)
+	strokes = []
+	for _ in range(40):
+		cx, cy = rng.uniform(AREA[0] + 100, AREA[2] - 100), rng.uniform(AREA[1] + 60, AREA[3] - 60)
+		pts = []
+		for i in range(400):
+			a = i * 0.35
+			pts.append((i * 1.0, cx + 90 * math.sin(a) + rng.uniform(-3, 3), cy + 60 * math.sin(a * 1.7)))
+		strokes.append(pts)
+	return {"name": "scribble", "size": SIZE, "strokes": strokes}
+
+
+def long_trace(seed=2):
+	"""A few strokes with thousands of samples crossing the whole window."""
+	rng = random.Random(seed)
+	strokes = []
+	for _ in range(4):
+		phase = rng.uniform(0, math.tau)
+		pts = []
+		for i in range(5000):
+			t = i / 5000
+			pts.append((i * 4.0, AREA[0] + (AREA[2] - AREA[0]) * t, 390 + 240 * math.sin(phase + t * 9 * math.pi)))
+		strokes.append(pts)
+	return {"name": "long", "size": SIZE, "strokes": strokes}
+
+
+def short_trace(seed=3):
+	"""Many quick dabs, like hatching or handwriting."""
+	rng = random.Random(seed)
+	strokes = []
+	for _ in range(1500):
+		x, y = rng.uniform(AREA[0], AREA[2] - 20), rng.uniform(AREA[1] + 5, AREA[3] - 5)
+		strokes.append([(i * 8.0, x + i * 2.5, y + rng.uniform(-2, 2)) for i in range(6)])
+	return {"name": "short", "size": SIZE, "strokes": strokes}
+
+
+SYNTHETIC = (scribble_trace, long_trace, short_trace)
+FILL_SIZE = (3840, 2160)
+
+
+def _mouse(kind, x, y, button, buttons):
+	pos = QPointF(x, y)
+	return QMouseEvent(kind, pos, pos, button, buttons, Qt.NoModifier)
+
+
+def percentiles(samples):
+	if not samples:
+		return {}
+	s = sorted(samples)
+
+	def at(q):
+		return round(s[min(len(s) - 1, int(q * len(s)))], 4)
+
+	return {"n": len(s), "p50": at(0.5), "p90": at(0.9), "p99": at(0.99), "max": round(s[-1], 4)}
+
+
+def run_trace(board_cls, trace):
+	app = QApplication.instance()
+	events, flushes, paints = [], [], []
+	peak_ram = peak_disk = 0
+
+	class TimedBoard(board_cls):
+		def paintEvent(self, e):
+			t = time.perf_counter()
+			super().paintEvent(e)
+			paints.append((time.perf_counter() - t) * 1e3)
+
+	board = TimedBoard(autosave_path=None)  # keep the user's autosave out of it
+	board.resize(*trace["size"])
+	board.show()
+	app.processEvents()  # exposed, so updates turn into paint events
+	paints.clear()
+
+	def timed(out, fn, *args):
+		t = time.perf_counter()
+		fn(*args)
+		out.append((time.perf_counter() - t) * 1e3)
+
+	def frame():
+		timed(flushes, board._flush_points)
+		app.processEvents()
+
+	def sample_history():
+		nonlocal peak_ram, peak_disk
+		peak_ram = max(peak_ram, board.history.ram_bytes)
+		peak_disk = max(peak_disk, board.history.disk_bytes)
+
+	start = time.perf_counter()
+	for stroke in trace["strokes"]:
+		t0, x, y = stroke[0]
+		timed(events, board.mousePressEvent, _mouse(QEvent.MouseButtonPress, x, y, Qt.LeftButton, Qt.LeftButton))
+		next_frame = t0 + FRAME_MS
+		for t, x, y in stroke[1:]:
+			if t >= next_frame:
+				frame()
+				next_frame = t + FRAME_MS
+			timed(events, board.mouseMoveEvent, _mouse(QEvent.MouseMove, x, y, Qt.NoButton, Qt.LeftButton))
+		timed(events, board.mouseReleaseEvent, _mouse(QEvent.MouseButtonRelease, x, y, Qt.LeftButton, Qt.NoButton))
+		app.processEvents()
+		sample_history()
+	total = time.perf_counter() - start
+
+	undos, redos = [], []
+	while board.history.undo_stack:
+		timed(undos, board.undo)
+		sample_history()
+	while board.history.redo_stack:
+		timed(redos, board.redo)
+		sample_history()
+
+	result = {
+		"strokes": len(trace["strokes"]),
+		"samples": sum(len(s) for s in trace["strokes"]),
+		"total_ms": round(total * 1e3, 1),
+		"event_ms": percentiles(events),
+		"flush_ms": percentiles(flushes),
+		"paint_ms": percentiles(paints),
+		"undo_ms": percentiles(undos),
+		"redo_ms": percentiles(redos),
+		"history_peak_ram_bytes": peak_ram,
+		"history_peak_disk_bytes": peak_disk,
+		"canvas_tiles": len(board.canvas.tiles),
+	}
+	board.close()
+	return result
+
+
+def run_fill(board_cls, dabs, runs=5, seed=4):
+	"""Time each stage of a bucket fill from the middle of a 4K board.
+
+	The board is covered in ``dabs`` short pen strokes first, which the
+	fill has to find its way around.
+	"""
+	from array import array
+
+	from Features.whiteboard.fill import flood_fill, gather
+	from Features.whiteboard.strokes import Stroke
+
+	app = QApplication.instance()
+	board = board_cls(autosave_path=None)
+	board.resize(*FILL_SIZE)
+	board.show()
+	app.processEvents()
+	rng = random.Random(seed)
+	w, h = FILL_SIZE
+	for _ in range(dabs):
+		x, y = rng.uniform(0, w), rng.uniform(0, h)
+		stroke = Stroke("pen", 0xFFE6E6E6, rng.choice((2, 4, 8)), array("f", (x, y, x + rng.uniform(-30, 30), y + rng.uniform(-30, 30))))
+		board.canvas.paint(stroke.bounds().toAlignedRect(), stroke.render)
+
+	region = board.world_rect(board.rect())
+	x, y = w // 2, h // 2
+	alpha = gather(board.canvas, region)[y] >> 24
+	while alpha[x]:
+		x += 1  # start on an empty pixel
+	layer = board.layers.active.id
+	gathers, floods, commits = [], [], []
+	for _ in range(runs):
+		t = time.perf_counter()
+		pixels = gather(board.canvas, region)
+		gathers.append((time.perf_counter() - t) * 1e3)
+		t = time.perf_counter()
+		spans = flood_fill(pixels, x, y, board.fill_tolerance)
+		floods.append((time.perf_counter() - t) * 1e3)
+		t = time.perf_counter()
+		board._commit_fill(spans, region, 0xFF3070C0, layer)
+		commits.append((time.perf_counter() - t) * 1e3)
+		board.undo()
+	result = {
+		"pixels": region.width() * region.height(),
+		"runs": len(spans[0]),
+		"gather_ms": percentiles(gathers),
+		"flood_ms": percentiles(floods),
+		"commit_ms": percentiles(commits),
+	}
+	board.close()
+	return result
+
+
+def peak_rss_bytes():
+	try:
+		import resource
+	except ImportError:
+		return None
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return rss if sys.platform == "darwin" else rss * 1024
+
+
+def compare(old, new, tolerance):
+	"""Lines describing percentiles that got slower than ``tolerance`` allows."""
+	worse = []
+	runs = [(n, r, old.get("traces", {}).get(n)) for n, r in new["traces"].items()]
+	runs += [(f"fill.{n}", r, old.get("fill", {}).get(n)) for n, r in new.get("fill", {}).items()]
+	for name, result, before in runs:
+		if before is None:
+			continue
+		for metric, stats in result.items():
+			if not isinstance(stats, dict):
+				continue
+			for q in ("p50", "p90", "p99"):
+				a, b = before.get(metric, {}).get(q), stats.get(q)
+				# Sub-10 µs timings are mostly timer noise
+				if a is not None and b is not None and b > max(a, 0.01) * (1 + tolerance):
+					worse.append(f"{name}.{metric}.{q}: {a} -> {b} ms")
+	return worse
+
+
+class _Recorder(QObject):
+	def __init__(self, board):
+		super().__init__(board)
+		self.board = board
+		self.strokes = []
+		self._start = time.perf_counter()
+
+	def eventFilter(self, obj, e):
+		kind = e.type()
+		if kind in (QEvent.MouseButtonPress, QEvent.MouseMove, QEvent.MouseButtonRelease):
+			if kind == QEvent.MouseButtonPress and e.button() == Qt.LeftButton:
+				self.strokes.append([])
+			if self.strokes and (e.buttons() & Qt.LeftButton or kind == QEvent.MouseButtonRelease):
+				p = e.position()
+				self.strokes[-1].append((round((time.perf_counter() - self._start) * 1e3, 2), p.x(), p.y()))
+		return False
+
+
+def record(board_cls, path):
+	board = board_cls(autosave_path=None)
+	board.resize(*SIZE)
+	recorder = _Recorder(board)
+	board.installEventFilter(recorder)
+	board.show()
+	QApplication.instance().exec()
+	trace = {"name": path.rsplit("/", 1)[-1].split(".")[0], "size": SIZE, "strokes": [s for s in recorder.strokes if s]}
+	with open(path, "w") as f:
+		json.dump(trace, f)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+	parser.add_argument("--out")
+	parser.add_argument("--trace", action="append", default=[])
+	parser.add_argument("--only", action="append")
+	parser.add_argument("--no-fill", action="store_true")
+	parser.add_argument("--compare")
+	parser.add_argument("--tolerance", type=float, default=0.25)
+	parser.add_argument("--record")
+	args = parser.parse_args(argv)
+
+	app = QApplication.instance() or QApplication([])
+	from Features.whiteboard.whiteboard import Whiteboard
+
+	if args.record:
+		record(Whiteboard, args.record)
+		return 0
+
+	traces = [make() for make in SYNTHETIC]
+	for path in args.trace:
+		with open(path) as f:
+			traces.append(json.load(f))
+	if args.only:
+		traces = [t for t in traces if t["name"] in args.only]
+
+	results = {
+		"python": platform.python_version(),
+		"pyside": PYSIDE_VERSION,
+		"platform": QApplication.platformName(),
+		"traces": {t["name"]: run_trace(Whiteboard, t) for t in traces},
+	}
+	if not args.no_fill:
+		results["fill"] = {
+			"4k_empty": run_fill(Whiteboard, 0),
+			"4k_dabs": run_fill(Whiteboard, 4000),
+		}
+	results["peak_rss_bytes"] = peak_rss_bytes()
+	app.processEvents()
+
+	text = json.dumps(results, indent=2)
+	if args.out:
+		with open(args.out, "w") as f:
+			f.write(text + "\n")
+	else:
+		print(text)
+
+	if args.compare:
+		with open(args.compare) as f:
+			worse = compare(json.load(f), results, args.tolerance)
+		for line in worse:
+			print("slower:", line, file=sys.stderr)
+		return 1 if worse else 0
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -1,11 +1,11 @@
 import sys
-from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QHBoxLayout, QLabel, QSizePolicy
+from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QHBoxLayout, QLabel
 from PySide6.QtCore import Qt
 
 
 from UI.components.NavBar import NavBar
-from Features.whiteboard.whiteboard import Whiteboard
-from Features.brain_storm.brainStrom import BrainStorm
+from UI.components.SceneStack import SceneStack
+from UI.scenes import SCENES, prewarm_after_paint
 
 class MainWindow(QMainWindow):
 	def __init__(self):
@@ -18,54 +18,31 @@ class MainWindow(QMainWindow):
 		hl.setContentsMargins(0,0,0,0)
 		hl.setSpacing(0)
 
-		self.navbar = NavBar()
+		self.navbar = NavBar(SCENES.values())
+		self.navbar.sceneClicked.connect(self.change_scene)
 		hl.addWidget(self.navbar)
 
-		self.navbar.homeClicked.connect(lambda: self.change_scene("home"))
-		self.navbar.projectsClicked.connect(lambda: self.change_scene("projects"))
-		self.navbar.brainstormClicked.connect(lambda: self.change_scene("brainstorm"))
-		self.navbar.whiteboardClicked.connect(lambda: self.change_scene("whiteboard"))
-		self.navbar.settingsClicked.connect(lambda: self.change_scene("settings"))
-
-		self.content = QLabel("Main Content Area")
-		self.content.setAlignment(Qt.AlignCenter)
-		self.content.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+		# Pages are imported and built on first visit and kept, so switching
+		# back is instant
+		self.content = SceneStack({name: scene.build for name, scene in SCENES.items()})
+		placeholder = QLabel("Main Content Area")
+		placeholder.setAlignment(Qt.AlignCenter)
+		self.content.addWidget(placeholder)
 		hl.addWidget(self.content, 1)
 
 		self.setCentralWidget(central)
 	
 	def change_scene(self, scene: str):
-		match scene:
-			case "whiteboard":
-				new_widget = Whiteboard()
-			case "home":
-				new_widget = QLabel("🏠 Home Page")
-			case "projects":
-				new_widget = QLabel("📂 Projects Page")
-			case "brainstorm":
-				new_widget = BrainStorm()
-			case "settings":
-				new_widget = QLabel("⚙ Settings Page")
-			case _:
-				return  # invalid scene, do nothing
-
-		# new_widget.setAlignment(Qt.AlignCenter)
-		new_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-
-		# Get layout and replace the content widget
-		layout = self.centralWidget().layout()
-
-		# Remove old content widget
-		layout.removeWidget(self.content)
-		self.content.deleteLater()
+		self.content.show_scene(scene)  # unknown scenes are ignored
 
-		# Set new widget
-		self.content = new_widget
-		layout.addWidget(self.content, 1)
+	def closeEvent(self, e):
+		self.content.close_all()
+		super().closeEvent(e)
 
 if __name__ == "__main__":
 	app = QApplication(sys.argv)
 	win = MainWindow()
+	prewarm_after_paint(win)  # import the other pages once the window is up
 	win.show()
 	sys.exit(app.exec())
 	 